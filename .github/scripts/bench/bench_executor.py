@@ -0,0 +1,53 @@
+"""
+script: bench/bench_executor.py
+
+Benchmark the concurrent fetch layer against the fake `gh` in this directory.
+
+    python3 .github/scripts/bench/bench_executor.py --calls 200 --latency 0.05 --workers 1 4 16
+"""
+
+import os
+import sys
+import time
+import argparse
+
+bench = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(bench))
+
+from utils.executor import Executor
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Benchmark concurrent gh calls')
+    parser.add_argument('--calls', type=int, default=100, help='number of gh calls per run')
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated seconds per call')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='probability of a rate limited call')
+    parser.add_argument('--workers', type=int, nargs="+", default=[1, 4, 8, 16], help='worker caps to compare')
+    args = parser.parse_args()
+
+    os.environ["PATH"] = bench + os.pathsep + os.environ["PATH"]
+    os.environ["FAKE_GH_LATENCY"] = str(args.latency)
+    os.environ["FAKE_GH_RATE_LIMIT"] = str(args.rate_limit)
+    os.environ["FAKE_GH_RETRY_AFTER"] = "0"
+    numbers = ["101", "102", "103"]
+    cmds = [f'gh pr view "{numbers[i % len(numbers)]}" --json title' for i in range(args.calls)]
+
+    print("| Workers | Calls | Seconds | Calls/sec | Retries |")
+    print("| -------------- | -------------- | -------------- | -------------- | -------------- |")
+    baseline = None
+    for workers in args.workers:
+        executor = Executor(workers=workers, backoff=0.01)
+        start = time.perf_counter()
+        results = executor.map(cmds)
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+        failed = [result for result in results if not result.fine]
+        if failed:
+            raise ValueError(f"{len(failed)} calls failed: {failed[0].what}")
+        if baseline is None:
+            baseline = results
+        elif [result.what for result in results] != [result.what for result in baseline]:
+            raise ValueError("Results differ from the first run")
+        retries = sum(result.retries for result in results)
+        print(f"| {workers} | {args.calls} | {elapsed:.2f} | {args.calls / elapsed:.1f} | {retries} |")
@@ -0,0 +1,287 @@
+"""
+script: bench/bench_release.py
+
+End to end benchmark of the releaser and the validator without GitHub.
+For every size a synthetic repository is generated with one commit per pr
+since the latest release, along with fixtures for the fake `gh` in this
+directory, and then -
+
+    get_pr_list          `git log` scan of the release range
+    get_release_details  fetching all the prs and rendering the notes
+    stream_release_details  the same through the streaming pipeline, with a
+                         1 MB memory budget so large groups spill to disk
+    create_changelog     bootstrapping the legacy notes of every release
+    update_changelog     inserting the notes into the existing changelog
+    validate             validating every pr in one batch
+
+    python3 .github/scripts/bench/bench_release.py --prs 10 100 1000 10000
+
+By default the `gh` calls made through the executor are answered in
+process by `LocalTransport`, so the numbers measure this repository rather
+than the fake `gh` parsing its fixtures once per process. Pass
+`--transport gh` to go through the fake `gh` executable end to end.
+
+Each run is appended to `.github/.cache/bench-history.jsonl`, which is
+never committed, and compared with the last run of the same size and
+options, so speedups and regressions show up as a change against the
+previous numbers.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from contextlib import redirect_stdout
+
+bench = os.path.dirname(os.path.realpath(__file__))
+scripts = os.path.dirname(bench)
+sys.path.insert(0, scripts)
+
+from utils.executor import Executor
+from utils.records import PRRecord
+from utils.loader import LocalTransport
+from utils.cache import ensure_cache_dir
+
+TYPES = ["feat", "fix", "enh", "break", "chore"]
+LABELS = {
+    "fix": "type/bugfix",
+    "enh": "type/enhancement",
+    "feat": "type/feature",
+    "break": "type/breaking",
+    "chore": "type/chore"
+}
+BASE_TAG = "1.0.0"
+# In the cache directory, which ignores itself, so a release run in the same
+# checkout (`git add .`) never commits it
+HISTORY_FILE = os.path.join(os.path.dirname(scripts), ".cache", "bench-history.jsonl")
+BENCHMARKS = ["get_pr_list", "get_release_details", "stream_release_details", "create_changelog", "update_changelog", "validate"]
+STREAM_BUDGET = 1 << 20
+
+
+def synthetic_pr(number: int, template: str) -> dict:
+    """
+    A GraphQL `pullRequest` node which passes validation. Every 100th pr
+    carries a stale type label, so the validator has labels to correct.
+    """
+
+    pr_type = TYPES[number % len(TYPES)]
+    jira = f"PLAT-{number}"
+    if pr_type == "chore":
+        title = f"chore: housekeeping {number}"
+        branch = f"chore-{number}"
+    else:
+        title = f"{pr_type}({jira}): change number {number}"
+        branch = f"{jira}-change"
+    body = template
+    if pr_type != "chore":
+        body = body.replace("- N/A", f"- [{jira}](https://example.atlassian.net/browse/{jira})", 1)
+    if pr_type == "break":
+        body = body.replace(
+            "<!--- MANDATORY (can't be N/A) for break -->\n- N/A",
+            f"<!--- MANDATORY (can't be N/A) for break -->\n- [{jira}](https://example.atlassian.net/browse/{jira})"
+        )
+    label = LABELS[pr_type] if number % 100 else "type/chore" if pr_type != "chore" else "type/bugfix"
+    return {
+        "title": title,
+        "url": f"https://github.com/example/repo/pull/{number}",
+        "body": body,
+        "author": {"login": f"dev{number % 17}"},
+        "labels": {"nodes": [{"name": label}]},
+        "headRefName": branch,
+        "updatedAt": "2024-08-01T10:00:00Z",
+    }
+
+
+def synthetic_release(index: int) -> dict:
+    """
+    A GraphQL `Release` node, newest first, with a few lines of notes
+    """
+
+    tag = BASE_TAG if index == 0 else f"0.{index // 100}.{index % 100}"
+    description = "\n".join(f"- change {line} of release {tag}" for line in range(10))
+    return {
+        "tagName": tag,
+        "publishedAt": "2024-08-01T10:00:00Z",
+        "isLatest": index == 0,
+        "isDraft": False,
+        "isPrerelease": False,
+        "description": description,
+    }
+
+
+def synthetic_repo(directory: str, prs: int) -> None:
+    """
+    Create a repository with the release artifacts tagged as `BASE_TAG`,
+    followed by one squash-merged commit per pr. The commits are written
+    with `git fast-import`, so even 10,000 of them take a moment.
+    """
+
+    github = os.path.join(scripts, "..")
+    os.makedirs(os.path.join(directory, ".github"))
+    for name in ["release_template.md", "pull_request_template.md", "pr_rules.json"]:
+        shutil.copy(os.path.join(github, name), os.path.join(directory, ".github", name))
+    with open(os.path.join(directory, "releases.yaml"), "w") as f:
+        f.write(f"release_note_generator:\n  release: {BASE_TAG}\n")
+
+    git = ["git", "-C", directory]
+    env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+               GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+    subprocess.run(git + ["init", "-q", "-b", "main"], check=True, env=env)
+    subprocess.run(git + ["add", "."], check=True, env=env)
+    subprocess.run(git + ["commit", "-q", "-m", "init"], check=True, env=env)
+    subprocess.run(git + ["tag", BASE_TAG], check=True, env=env)
+
+    stream = io.StringIO()
+    for number in range(1, prs + 1):
+        message = f"{TYPES[number % len(TYPES)]}: change number {number} (#{number})"
+        stream.write(f"commit refs/heads/main\ncommitter bench <bench@example.com> {1700000000 + number} +0000\n")
+        stream.write(f"data {len(message.encode())}\n{message}\n")
+        if number == 1:
+            stream.write("from refs/heads/main^0\n")
+        stream.write("\n")
+    subprocess.run(git + ["fast-import", "--quiet"], input=stream.getvalue(), text=True, check=True, env=env)
+    subprocess.run(git + ["reset", "-q", "--hard", "main"], check=True, env=env)
+
+
+def write_fixtures(path: str, prs: int, releases: int) -> None:
+    with open(os.path.join(scripts, "..", "pull_request_template.md")) as f:
+        template = f.read()
+    fixtures = {
+        "pulls": {str(number): synthetic_pr(number, template) for number in range(1, prs + 1)},
+        "releases": [synthetic_release(index) for index in range(releases)],
+    }
+    with open(path, "w") as f:
+        json.dump(fixtures, f)
+
+
+def timed(results: dict, name: str, func, *args):
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        value = func(*args)
+    results[name] = time.perf_counter() - start
+    return value
+
+
+def run_size(prs: int, loader: str, workers: int, transport: str) -> dict:
+    """
+    Run every benchmark on a fresh synthetic repository with `prs` prs and
+    return the seconds taken by each
+    """
+
+    import releaser
+    from pr_validator import validate_batch
+
+    results = dict()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="rng-bench-") as directory:
+        repo = os.path.join(directory, "repo")
+        fixtures = os.path.join(directory, "fixtures.json")
+        write_fixtures(fixtures, prs, max(1, prs // 10))
+        synthetic_repo(repo, prs)
+        os.environ["FAKE_GH_FIXTURES"] = fixtures
+        os.chdir(repo)
+        try:
+            release = releaser.Release(loader=loader, workers=workers)
+            executor = Executor(workers=workers)
+            if transport == "local":
+                release.executor.runner = executor.runner = LocalTransport(fixtures)
+            release.tag
+            found = timed(results, "get_pr_list", release.get_pr_list)
+            if len(found) != prs:
+                raise ValueError(f"Found {len(found)} prs in the synthetic history instead of {prs}")
+            release.prs = found
+
+            details = timed(results, "get_release_details", release.get_release_details)
+
+            # A fresh release, so the pipeline fetches every pr again
+            streamed = releaser.Release(loader=loader, workers=workers)
+            if transport == "local":
+                streamed.executor.runner = release.executor.runner
+            streamed.prs = found
+            streamed.tag
+            with tempfile.TemporaryDirectory(prefix="rng-stream-") as out:
+                paths = timed(results, "stream_release_details", streamed.stream_release_details, out, STREAM_BUDGET)
+                for key, path in paths.items():
+                    if path is None:
+                        continue
+                    with open(path) as f:
+                        if f.read() != details[key]:
+                            raise ValueError(f"The streamed {key} differs from get_release_details")
+            changelog = timed(results, "create_changelog", release.create_changelog)
+            with open("CHANGELOG.md", "w") as f:
+                f.write(changelog)
+            timed(results, "update_changelog", release.update_changelog, details["changelog"])
+
+            with open(fixtures) as f:
+                pulls = json.load(f)["pulls"]
+            records = {number: PRRecord.from_graphql(number, node) for number, node in pulls.items()}
+            report = timed(results, "validate", validate_batch, records, executor)
+            executor.shutdown()
+            if report.failures:
+                raise ValueError(f"{len(report.failures)} synthetic prs failed validation")
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def last_run(history: str, key: dict) -> dict:
+    """
+    The results of the most recent run in the history with the same options
+    """
+
+    previous = dict()
+    if os.path.exists(history):
+        with open(history) as f:
+            for line in f:
+                entry = json.loads(line)
+                if all(entry.get(field) == value for field, value in key.items()):
+                    previous = entry["results"]
+    return previous
+
+
+def revision() -> str:
+    result = subprocess.run(["git", "-C", scripts, "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Benchmark the releaser and validator on synthetic repositories')
+    parser.add_argument('--prs', type=int, nargs="+", default=[10, 100, 1000, 10000], help='number of prs in the release')
+    parser.add_argument('--loader', choices=["gh", "graphql"], default="graphql", help='pr loader used by the releaser')
+    parser.add_argument('--workers', type=int, default=8, help='maximum number of concurrent gh calls')
+    parser.add_argument('--transport', choices=["local", "gh"], default="local", help='answer gh calls in process (local) or with the fake gh executable')
+    parser.add_argument('--history', default=HISTORY_FILE, help='file the results are appended to')
+    parser.add_argument('--no-history', action='store_true', help='do not record this run')
+    args = parser.parse_args()
+
+    os.environ["PATH"] = bench + os.pathsep + os.environ["PATH"]
+    os.environ["FAKE_GH_LATENCY"] = "0"
+    os.environ["FAKE_GH_RATE_LIMIT"] = "0"
+
+    print("| PRs | Benchmark | Seconds | Previous | Change |")
+    print("| -------------- | -------------- | -------------- | -------------- | -------------- |")
+    for prs in args.prs:
+        key = {"prs": prs, "loader": args.loader, "workers": args.workers, "transport": args.transport, "python": platform.python_version()}
+        previous = last_run(args.history, key)
+        results = run_size(prs, args.loader, args.workers, args.transport)
+        for name in BENCHMARKS:
+            seconds = results[name]
+            if name in previous:
+                change = f"{(seconds - previous[name]) / previous[name] * 100:+.1f}%"
+                print(f"| {prs} | {name} | {seconds:.3f} | {previous[name]:.3f} | {change} |")
+            else:
+                print(f"| {prs} | {name} | {seconds:.3f} | | |")
+        if not args.no_history:
+            entry = dict(key, date=datetime.now(timezone.utc).isoformat(timespec="seconds"), revision=revision(), results=results)
+            if args.history == HISTORY_FILE:
+                ensure_cache_dir(os.path.dirname(HISTORY_FILE))
+            with open(args.history, "a") as f:
+                f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,74 @@
+"""
+script: bench/bench_sections.py
+
+Micro-benchmark of the pull request body parser on synthetic bodies.
+Compares the previous approach (one `find()` scan per section and consumer)
+with a single `parse_body()` pass shared by all consumers.
+
+    python3 .github/scripts/bench/bench_sections.py --size 100000 --rounds 200
+"""
+
+import os
+import sys
+import timeit
+import argparse
+
+bench = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(bench))
+
+from utils.sections import BREAKING_SECTION, JIRA_PATTERN, JIRA_SECTION, parse_body
+
+
+def synthetic_body(size: int) -> str:
+    """
+    Render the pull request template padded to roughly `size` characters
+    """
+
+    with open(os.path.join(bench, "..", "..", "pull_request_template.md")) as f:
+        template = f.read()
+    filler = "- a line describing the change in some detail\n"
+    padding = filler * max(0, (size - len(template)) // len(filler) // 2)
+    body = template.replace("- N/A", "- [PLAT-1234](https://example.atlassian.net/browse/PLAT-1234)", 1)
+    body = body.replace("### What?\n", "### What?\n" + padding, 1)
+    return body.replace("<!--- MANDATORY (can't be N/A) for break -->\n- N/A", "<!--- MANDATORY (can't be N/A) for break -->\n" + padding)
+
+
+def find_section(body: str, heading: str) -> list:
+    start = body.find(f"### {heading}")
+    end = body.find("-----", start)
+    return body[start:end].split("\n")
+
+
+def previous(body: str) -> tuple:
+    # get_jiras, get_sops and validate_body each scanned the body on their own
+    jiras = [line[2:].strip() for line in find_section(body, JIRA_SECTION) if line.startswith("- ")]
+    sops = [line for line in find_section(body, BREAKING_SECTION)[1:] if not line.startswith("<!")]
+    checked = [line for line in find_section(body, JIRA_SECTION) if line.startswith("-") and JIRA_PATTERN.match(line.strip())]
+    checked += [line for line in find_section(body, BREAKING_SECTION) if line.startswith("-")]
+    return jiras, sops, checked
+
+
+def single_pass(body: str) -> tuple:
+    sections = parse_body(body)
+    jira, breaking = sections[JIRA_SECTION], sections[BREAKING_SECTION]
+    jiras = [
+        f"[{jira.jiras[item].id}]({jira.jiras[item].url})" if item in jira.jiras else item[2:].strip()
+        for item in jira.items if item.startswith("- ")
+    ]
+    sops = [line for line in breaking.lines if not line.startswith("<!")]
+    checked = [item for item in jira.items if item in jira.jiras] + breaking.items
+    return jiras, sops, checked
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Benchmark the pull request body parser')
+    parser.add_argument('--size', type=int, default=100000, help='approximate body size in characters')
+    parser.add_argument('--rounds', type=int, default=200, help='number of bodies parsed per measurement')
+    args = parser.parse_args()
+
+    body = synthetic_body(args.size)
+    print(f"Body size: {len(body)} characters")
+    for name, function in [("previous", previous), ("single pass", single_pass)]:
+        seconds = min(timeit.repeat(lambda: function(body), number=args.rounds, repeat=3))
+        print(f"{name}: {seconds / args.rounds * 1e6:.1f} us per body")
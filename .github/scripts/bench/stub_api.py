@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+script: bench/stub_api.py
+
+A stub of the GitHub GraphQL API answering from the fixtures of
+`utils.loader.LocalTransport`, so `fanout.py` can run without GitHub.
+Every repository is served the same fixtures. The history of the default
+branch has one squash-merged commit per fixture pr, newest first, on top
+of the commit of the latest release.
+
+    python3 .github/scripts/bench/stub_api.py --port 8765 &
+    GITHUB_GRAPHQL_URL=http://127.0.0.1:8765/graphql python3 .github/scripts/fanout.py owner/a owner/b
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+scripts = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, scripts)
+
+from utils.loader import LocalTransport
+
+RELEASE_COMMIT = "0" * 40
+FIRST_PATTERN = re.compile(r'history\(first: (\d+)')
+
+
+class StubAPI(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, fixtures: str, port: int = 0, latency: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.local = LocalTransport(fixtures)
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.history = [
+            {"oid": f"{int(number):040x}", "messageHeadline": f'{node["title"]} (#{number})', "parents": {"totalCount": 1}}
+            for number, node in sorted(self.local.pulls.items(), key=lambda item: -int(item[0]))
+        ] + [{"oid": RELEASE_COMMIT, "messageHeadline": "release", "parents": {"totalCount": 1}}]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/graphql"
+
+    def answer(self, query: str, variables: dict) -> str:
+        if "latestRelease" in query:
+            latest = next((release for release in self.local.releases if release.get("isLatest")), None)
+            node = {"tagName": latest["tagName"], "tagCommit": {"oid": RELEASE_COMMIT}} if latest else None
+            return json.dumps({"data": {"repository": {"latestRelease": node}}})
+        match = FIRST_PATTERN.search(query)
+        if match:
+            start = int(variables.get("after") or 0)
+            end = start + int(match.group(1))
+            history = {
+                "pageInfo": {"hasNextPage": end < len(self.history), "endCursor": str(end)},
+                "nodes": self.history[start:end]
+            }
+            target = {"target": {"history": history}}
+            return json.dumps({"data": {"repository": {"defaultBranchRef": target}}})
+        after = variables.get("after")
+        argv = ["gh", "api", "graphql", "-F", f"after={'null' if after is None else after}", "-f", f"query={query}"]
+        return self.local.graphql(argv).what
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        body = self.server.answer(request["query"], request.get("variables") or dict()).encode()
+        with self.server.lock:
+            self.server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start(fixtures: str, port: int = 0, latency: float = 0.0) -> StubAPI:
+    """
+    Serve the stub on a background thread and return it
+    """
+
+    server = StubAPI(fixtures, port, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Serve a stub of the GitHub GraphQL API')
+    parser.add_argument('--fixtures', default=os.path.join(scripts, "fixtures", "pulls.json"), help='fixture file')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to sleep per request')
+    args = parser.parse_args()
+
+    server = StubAPI(args.fixtures, args.port, args.latency)
+    print(f"Serving {server.url}", flush=True)
+    server.serve_forever()
@@ -1,7 +1,13 @@
 #!/bin/bash
 
-labels=$(gh api repos/$1/$2/labels | jq -r '.[].name')
-for label in $labels; do
-  gh label delete $label --yes
+# Sync the labels of $1/$2 with this repository in place. `gh label clone --force`
+# creates the missing labels and updates the existing ones in one command, so only
+# the labels which do not exist here are deleted.
+source=chandratop/release-note-generator
+wanted=$(gh label list --repo $source --limit 1000 --json name -q '.[].name')
+gh label list --repo $1/$2 --limit 1000 --json name -q '.[].name' | while IFS= read -r label; do
+  if ! grep -Fxq -- "$label" <<< "$wanted"; then
+    gh label delete "$label" --repo $1/$2 --yes
+  fi
 done
-gh label clone chandratop/release-note-generator --repo $1/$2
+gh label clone $source --repo $1/$2 --force
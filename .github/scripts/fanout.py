@@ -0,0 +1,151 @@
+"""
+script: fanout.py
+
+This script generates the release notes of many repositories in one
+process, without cloning them. Every repository shares one authenticated
+GraphQL session, one pr metadata cache and one bounded worker pool, and
+gets its own output directory -
+
+    <out>/<owner>/<name>/RELEASE.md             release notes of the next release
+    <out>/<owner>/<name>/CHANGELOG.section.md   section for CHANGELOG.md
+    <out>/<owner>/<name>/BREAKING.section.md    section for BREAKING.md
+    <out>/summary.json                          next tag, prs and timing per repository
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from types import SimpleNamespace
+from typing import List
+from releaser import Release
+from utils.cache import PRCache, ScopedCache
+from utils.executor import Executor
+from utils.github import GitHubSession
+from utils.gitlog import CONVENTIONS
+from utils.loader import load_history_prs, load_latest_release
+from utils.trace import tracer
+
+MANIFEST_REPO_PATTERN = re.compile(r'^\s+repo:\s*([\w\.\-/]+)\s*$')
+
+
+def read_manifest(path: str, owner: str) -> List[str]:
+    """
+    Return the `owner/name` of every `repo:` entry of a manifest such as
+    `releases.yaml`. Entries without an owner belong to `owner`.
+    """
+
+    repositories = list()
+    with open(path) as f:
+        for line in f:
+            match = MANIFEST_REPO_PATTERN.match(line)
+            if match:
+                name = match.group(1)
+                if "/" not in name:
+                    if not owner:
+                        raise ValueError(f"Repository {name} in {path} has no owner, pass --owner")
+                    name = f"{owner}/{name}"
+                repositories.append(name)
+    return repositories
+
+
+@tracer.timed
+def release_repository(repository: str, session: GitHubSession, cache: PRCache, out: str, convention: str) -> SimpleNamespace:
+    """
+    Generate the release notes of one repository and write its outputs
+    """
+
+    start = time.perf_counter()
+    executor = Executor(workers=1, runner=session.transport(repository))
+    latest = load_latest_release(executor.run)
+    history = load_history_prs(latest.oid, convention, executor.run)
+
+    release = Release(loader="graphql", workers=1, convention=convention)
+    release.executor = executor
+    release.cache = ScopedCache(cache, repository) if cache is not None else None
+    release.tag = latest.tag
+    release.prs = history.prs
+    release_details = release.get_release_details()
+
+    directory = os.path.join(out, repository)
+    os.makedirs(directory, exist_ok=True)
+    outputs = {
+        "RELEASE.md": release_details["release"],
+        "CHANGELOG.section.md": release_details["changelog"],
+        "BREAKING.section.md": release_details["breaking"],
+    }
+    for file_name, body in outputs.items():
+        with open(os.path.join(directory, file_name), "w") as f:
+            f.write(body)
+    return SimpleNamespace(
+        repository=repository, tag=release.tag, next_tag=release.next_tag,
+        prs=len(history.prs), seconds=time.perf_counter() - start, error=""
+    )
+
+
+def fanout(repositories: List[str], session: GitHubSession, cache: PRCache, out: str, workers: int, convention: str) -> List[SimpleNamespace]:
+    """
+    Release every repository on a pool of `workers` threads. A failing
+    repository is reported without stopping the others.
+    """
+
+    def job(repository: str) -> SimpleNamespace:
+        try:
+            return release_repository(repository, session, cache, out, convention)
+        except Exception as e:
+            return SimpleNamespace(repository=repository, tag="", next_tag="", prs=0, seconds=0.0, error=str(e))
+
+    pool = Executor(workers=workers)
+    if pool.workers == 1:
+        results = [job(repository) for repository in repositories]
+    else:
+        results = list(pool.pool.map(job, repositories))
+    pool.shutdown()
+    if cache is not None:
+        cache.save()
+    return results
+
+
+def main(argv: list = None) -> None:
+
+    parser = argparse.ArgumentParser(description='Generate the release notes of many repositories')
+    parser.add_argument('repositories', nargs="*", help='owner/name of the repositories')
+    parser.add_argument('--manifest', help='manifest listing the repositories, e.g. releases.yaml')
+    parser.add_argument('--owner', default=os.environ.get("GITHUB_REPOSITORY_OWNER", ""), help='owner of the manifest entries without one')
+    parser.add_argument('--out', default="release-notes", help='directory of the per repository outputs')
+    parser.add_argument('--workers', type=int, default=8, help='maximum number of repositories released concurrently')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the pr metadata cache')
+    parser.add_argument('--convention', choices=list(CONVENTIONS), default="auto", help='how merged prs appear in the history')
+    args = parser.parse_args(argv)
+
+    repositories = list(args.repositories)
+    if args.manifest:
+        repositories += read_manifest(args.manifest, args.owner)
+    if not repositories:
+        parser.error("no repositories given")
+
+    session = GitHubSession()
+    cache = None if args.no_cache else PRCache()
+    start = time.perf_counter()
+    results = fanout(repositories, session, cache, args.out, args.workers, args.convention)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "summary.json"), "w") as f:
+        json.dump([vars(result) for result in results], f, indent=2)
+    for result in results:
+        if result.error:
+            print(f"{result.repository}: FAILED {result.error}")
+        else:
+            print(f"{result.repository}: {result.tag} -> {result.next_tag}, {result.prs} prs in {result.seconds:.2f}s")
+    failed = [result for result in results if result.error]
+    print(f"Released {len(results) - len(failed)}/{len(results)} repositories in {elapsed:.2f}s "
+          f"({session.requests} requests over {session.connections} connections)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,19 @@ If all the validations pass then it will allow merging the pull request.
 Otherwise it will block the merge.
 """
 
-import re
+import sys
+import json
+import time
 import argparse
-from typing import Any, List, Tuple, Literal
-from utils.utils import run
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+from utils.executor import Executor
+from utils.records import PRRecord
+from utils.loader import fetch_pr, load_open_prs, load_prs_graphql
+from utils.rules import SECTION_TARGET, RuleSet
+from utils.labels import LabelState, sync_labels
+from utils.trace import tracer
+from utils.utils import display
 
 
 class PR:
@@ -18,37 +27,28 @@ class PR:
     body & labels.
     """
 
-    def __init__(self, pr_number: str) -> None:
+    def __init__(
+        self,
+        pr_number: str,
+        executor: Executor = None,
+        record: PRRecord = None,
+        rules: RuleSet = None) -> None:
 
         self.pr_number = pr_number
+        self.rules = rules or RuleSet.load()
+        self.executor = executor or Executor(workers=1)
+        self.record = record
         self.labels, self.title, self.body, self.branch = self._get_pr_variables()
 
+    @tracer.timed
     def _get_pr_variables(self) -> Tuple[List[str], str, str, str]:
 
-        return self._get_value(type="list", variable="labels"),\
-            self._get_value(type="str", variable="title"),\
-            self._get_value(type="str", variable="body"),\
-            self._get_value(type="str", variable="headRefName")
-
-    def _get_value(
-        self,
-        type: Literal["list","str"],
-        variable: Literal[
-            "labels",
-            "title",
-            "body",
-            "headRefName"
-        ]) -> Any:
-
-        cmd = f'gh pr view "{self.pr_number}" --json {variable}'
-        result = run(cmd)
-        if result.fine:
-            if type == "str":
-                return eval(result.what)[f"{variable}"]
-            elif type == "list":
-                return [var["name"] for var in eval(result.what)[f"{variable}"]]
-        else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        # A single pr costs one call either way, checking a cached record
+        # against its `updatedAt` would cost the same call
+        if self.record is None:
+            self.record = fetch_pr(self.pr_number, self.executor.run)
+        record = self.record
+        return record.labels, record.title, record.body, record.branch
 
     def validate_title(self) -> str:
         """
@@ -58,15 +58,10 @@ class PR:
         ```
         """
 
-        pattern = r'^(fix|enh|feat|break)\(\w+-\d+\): [\w\d\-\. ]+$|(chore): [\w\d\-\. ]+$'
-        match = re.match(pattern, self.title)
-        if not bool(match):
-            raise ValueError(f"Improper title: {self.title}\nregex: '{pattern}'")
-        else:
-            if bool(match.group(1)):
-                return match.group(1)
-            else:
-                return match.group(2)
+        pr_type = self.rules.classify(self.title)
+        if pr_type is None:
+            raise ValueError(self.rules.title_violation(self.title).message)
+        return pr_type
 
     def validate_body(self, pr_type: str) -> None:
         """
@@ -76,34 +71,9 @@ class PR:
         should not have `N/A`
         """
 
-        if pr_type in ["fix", "enh", "feat", "break"]:
-            jira_section_start = self.body.find("### Related Jira Tickets")
-            jira_section_end = self.body.find("-----", jira_section_start)
-            jira_section_lines = self.body[jira_section_start:jira_section_end].split("\n")
-            number_of_points = 0
-            for line in jira_section_lines:
-                if line.startswith("-"):
-                    number_of_points += 1
-                    if "N/A" in line:
-                        raise ValueError(f"Jira section cannot contain N/A")
-                    if not bool(re.match(r'^- +\[[A-Z]+-\d+\]\(https://[a-zA-Z0-9\./\-]+\)$', line.strip())):
-                        raise ValueError(f"Jira doesn't follow the format [JIRA-ID](URL)")
-            if number_of_points == 0:
-                raise ValueError(f"Jira section cannot be empty")
-
-        if pr_type == "break":
-            breaking_section_start = self.body.find("### Breaking Changes")
-            breaking_section_end = self.body.find("-----", breaking_section_start)
-            breaking_section_lines = self.body[breaking_section_start:breaking_section_end].split("\n")
-            number_of_points = 0
-            for line in breaking_section_lines:
-                if line.startswith("-"):
-                    number_of_points += 1
-                    if "N/A" in line:
-                        print(breaking_section_lines)
-                        raise ValueError(f"Breaking Changes section cannot contain N/A")
-            if number_of_points == 0:
-                raise ValueError(f"Breaking Changes section cannot be empty")
+        violations = self.rules.check(pr_type, self._values(), self.record.sections, [SECTION_TARGET])
+        if violations:
+            raise ValueError(violations[0].message)
 
     def validate_branch(self, pr_type: str) -> None:
         """
@@ -111,20 +81,40 @@ class PR:
         the pull request branch should start with the Jira ID
         """
 
-        # form the regex pattern based on `pr_type`
-        if pr_type == "chore":
-            pattern = r'.+'
-        else:
-            pattern = r'[A-Z]+-\d+-[\w\d-]+'
-        if not bool(re.match(pattern, self.branch)):
-            raise ValueError(f"Improper branch: {self.branch}")
+        violations = self.rules.check(pr_type, self._values(), dict(), ["branch"])
+        if violations:
+            raise ValueError(violations[0].message)
+
+    def _values(self) -> Dict[str, str]:
+        return {"title": self.title, "branch": self.branch}
 
+    @tracer.timed
+    def evaluate(self) -> SimpleNamespace:
+        """
+        Evaluate every rule in one pass and return the pr type along with
+        all the violations
+        """
+
+        return self.rules.evaluate(self.title, self.body, self.branch, self.record.sections)
+
+    @tracer.timed
     def labeler(self, pr_type: str) -> None:
         """
         Post all checks are complete, it will validate and if needed
         correct the labels attached to the PR
         """
 
+        cmd = self.label_command(pr_type)
+        if cmd:
+            result = self.executor.run(cmd)
+            if not result.fine:
+                raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+
+    def label_changes(self, pr_type: str) -> Tuple[List[str], List[str]]:
+        """
+        Return the labels to add and to remove for the pr type
+        """
+
         type_mapping = {
             "fix": "type/bugfix",
             "enh": "type/enhancement",
@@ -141,31 +131,204 @@ class PR:
                         remove_label.append(label)
         if type_mapping[pr_type] not in add_label and type_mapping[pr_type] not in self.labels:
             add_label.append(type_mapping[pr_type])
+        return add_label, remove_label
+
+    def desired_labels(self, pr_type: str) -> List[str]:
+        """
+        The labels of the pr once `labeler` corrected them
+        """
+
+        add_label, remove_label = self.label_changes(pr_type)
+        return [label for label in self.labels if label not in remove_label] + add_label
 
-        # Form the command to fix labels
-        cmd = f'gh pr edit "{self.pr_number}"'
+    def fingerprint(self, state: LabelState, labels: List[str] = None) -> str:
+        """
+        Fingerprint of the pr with its current labels, or the given ones
+        """
+
+        return state.fingerprint(self.title, self.body, self.branch, self.labels if labels is None else labels)
+
+    def label_command(self, pr_type: str) -> List[str]:
+        """
+        Return the `gh pr edit` command which corrects the labels, or an empty
+        list if the labels are already correct
+        """
+
+        add_label, remove_label = self.label_changes(pr_type)
+        cmd = ["gh", "pr", "edit", str(self.pr_number)]
         if len(add_label) > 0:
-            labels_str = ",".join(add_label)
-            cmd += f' --add-label "{labels_str}"'
+            cmd += ["--add-label", ",".join(add_label)]
         if len(remove_label) > 0:
-            labels_str = ",".join(remove_label)
-            cmd += f' --remove-label "{labels_str}"'
-        if cmd != f'gh pr edit "{self.pr_number}"':
-            result = run(cmd)
+            cmd += ["--remove-label", ",".join(remove_label)]
+        if len(cmd) == 4:
+            return []
+        return cmd
+
+    def validate(self) -> str:
+        """
+        Run all the validations and return the pr type. Every violation is
+        reported at once.
+        """
+
+        result = self.evaluate()
+        if result.violations:
+            raise ValueError("\n".join(violation.message for violation in result.violations))
+        return result.type
+
+
+@tracer.timed
+def validate_batch(
+    records: Dict[str, PRRecord],
+    executor: Executor,
+    start: float = None,
+    state: LabelState = None,
+    bulk: bool = False) -> SimpleNamespace:
+    """
+    Validate many prs in-process, then apply all the label corrections
+    concurrently, or with `bulk` in batched GraphQL mutations. The prs
+    unchanged since the fingerprint kept in `state` are skipped. Returns
+    the failures, the label edits and the throughput measured from `start`
+    (defaults to now).
+    """
+
+    start = start or time.perf_counter()
+    failures = dict()
+    changes = dict()
+    cmds = list()
+    unchanged = 0
+    for number, record in records.items():
+        pr = PR(number, executor=executor, record=record)
+        if state is not None and state.unchanged(number, pr.fingerprint(state)):
+            unchanged += 1
+            continue
+        result = pr.evaluate()
+        if result.violations:
+            failures[number] = result.violations
+            continue
+        if bulk:
+            changes[number] = pr.label_changes(result.type)
+        else:
+            cmd = pr.label_command(result.type)
+            if cmd:
+                cmds.append(cmd)
+        if state is not None:
+            state.put(number, pr.fingerprint(state, pr.desired_labels(result.type)))
+    if bulk:
+        changes = {number: change for number, change in changes.items() if change[0] or change[1]}
+        calls = sync_labels(changes, executor.run)
+        labeled = len(changes)
+    else:
+        for cmd, result in zip(cmds, executor.map(cmds)):
             if not result.fine:
-                raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+                raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+        calls = labeled = len(cmds)
+    if state is not None:
+        state.save()
+    elapsed = time.perf_counter() - start
+    return SimpleNamespace(
+        total=len(records),
+        failures=failures,
+        labeled=labeled,
+        label_calls=calls,
+        unchanged=unchanged,
+        seconds=elapsed,
+        rate=len(records) / elapsed if elapsed > 0 else 0.0
+    )
 
-if __name__ == "__main__":
+
+def print_report(report: SimpleNamespace) -> None:
+    print(f"Validated {report.total} prs in {report.seconds:.2f}s ({report.rate:.1f} prs/sec)")
+    print(f"Passed: {report.total - len(report.failures)}, Failed: {len(report.failures)}, Unchanged: {report.unchanged}, Relabeled: {report.labeled} in {report.label_calls} calls")
+    if report.failures:
+        print("| PR | Error |")
+        print("| -------------- | -------------- |")
+        for number, violations in report.failures.items():
+            for violation in violations:
+                print(f"| #{number} | {violation.message.splitlines()[0]} |")
+
+
+def main(argv: list = None) -> None:
 
     parser = argparse.ArgumentParser(description='Fetch Pull Request number')
-    parser.add_argument('pr_number', help='The number of the Pull Request')
-    args = parser.parse_args()
+    parser.add_argument('pr_number', nargs='?', help='The number of the Pull Request')
+    parser.add_argument('--all-open', action='store_true', help='validate every open pull request')
+    parser.add_argument('--from-file', help='validate the pull requests listed in a file, one number per line')
+    parser.add_argument('--workers', type=int, default=8, help='maximum number of concurrent gh calls in batch mode')
+    parser.add_argument('--no-cache', action='store_true', help='validate again regardless of the fingerprints of the prs which passed')
+    parser.add_argument('--format', choices=["text", "json"], default="text", help='how to report the violations')
+    parser.add_argument('--event', help='GitHub event payload to read the pull request from instead of fetching it')
+    parser.add_argument('--bulk-labels', action='store_true', help='apply the label corrections in batched GraphQL mutations (batch mode)')
+    args = parser.parse_args(argv)
+
+    state = None if args.no_cache else LabelState()
+
+    if args.all_open or args.from_file:
+        start = time.perf_counter()
+        executor = Executor(workers=args.workers)
+        if args.all_open:
+            records = load_open_prs()
+        else:
+            with open(args.from_file) as f:
+                numbers = [line.strip().lstrip("#") for line in f if line.strip()]
+            records = load_prs_graphql(numbers, executor.run)
+        report = validate_batch(records, executor, start, state, args.bulk_labels)
+        if args.format == "json":
+            print(json.dumps({
+                "total": report.total,
+                "unchanged": report.unchanged,
+                "labeled": report.labeled,
+                "label_calls": report.label_calls,
+                "seconds": report.seconds,
+                "prs_per_sec": report.rate,
+                "failures": {number: [vars(violation) for violation in violations] for number, violations in report.failures.items()}
+            }, indent=2))
+        else:
+            print_report(report)
+        if report.failures:
+            sys.exit(1)
+        sys.exit(0)
 
-    # Instantiate PR
-    pr = PR(args.pr_number)
+    record = None
+    if args.event:
+        with open(args.event) as f:
+            pull_request = json.load(f).get("pull_request")
+        if pull_request is not None:
+            record = PRRecord.from_webhook(pull_request)
+            args.pr_number = args.pr_number or record.number
+            if record.number != str(args.pr_number):
+                parser.error(f"the event is about #{record.number}, not #{args.pr_number}")
+    if args.pr_number is None:
+        parser.error("pr_number is required unless --all-open, --from-file or --event is given")
+
+    # Instantiate PR, fetched with one call unless the event has it
+    pr = PR(args.pr_number, record=record)
+
+    # Nothing relevant changed since the pr last passed and was labeled
+    if state is not None and state.unchanged(pr.pr_number, pr.fingerprint(state)):
+        if args.format == "json":
+            print(json.dumps({"pr": args.pr_number, "unchanged": True, "violations": []}, indent=2))
+        else:
+            print(f"#{args.pr_number} is unchanged since it last passed validation")
+        return
 
     # Validate
-    pr_type = pr.validate_title()
-    pr.validate_body(pr_type)
-    pr.validate_branch(pr_type)
+    if args.format == "json":
+        result = pr.evaluate()
+        print(json.dumps({
+            "pr": args.pr_number,
+            "type": result.type,
+            "violations": [vars(violation) for violation in result.violations]
+        }, indent=2))
+        if result.violations:
+            sys.exit(1)
+        pr_type = result.type
+    else:
+        pr_type = pr.validate()
     pr.labeler(pr_type)
+    if state is not None:
+        state.put(pr.pr_number, pr.fingerprint(state, pr.desired_labels(pr_type)))
+        state.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,167 +6,282 @@ This script helps create a GitHub Release, CHANGELOG and Breaking-Change-SOPs
 
 import os
 import re
+import shutil
 import argparse
-from utils.utils import run
+import tempfile
+from utils.utils import display, run_checked
+from utils.records import PRRecord, ReleaseRecord
+from utils.decode import loads
+from utils.loader import fetch_pr, load_prs_gh, load_prs_graphql, load_updated_at
+from utils.executor import Executor
+from utils.cache import PRCache
+from utils.gitlog import CONVENTIONS, ensure_history, ensure_tag, extract_prs
+from utils.sections import BREAKING_SECTION, JIRA_SECTION
+from utils.changelog import bootstrap_changelog, insert_section
+from utils.trace import tracer
+from utils.template import TemplatePlan
+from utils.draft import DRAFT_NOTES_FILE, Draft
+from utils.index import TypeIndex, bump_operation
+from utils.pipeline import RECORD_ESTIMATE, SortedSpill, chunk_size, record_size
+from utils.snapshot import snapshot
+from utils.watermark import Watermark
 from datetime import datetime
+from contextlib import ExitStack
+from typing import IO, Union
+from functools import cached_property
 
 
 class Release:
 
-    def __init__(self):
-        self.tag = self.latest_tag()
+    type_mapping = {
+        "fix": "bugfix",
+        "enh": "enhancement",
+        "feat": "feature",
+        "break": "breaking",
+        "chore": "chore"
+    }
+
+    def __init__(self, loader: str = "gh", workers: int = 8, cache: PRCache = None, convention: str = "auto", skip_released: bool = False):
+        self.loader = loader
+        self.convention = convention
+        self.skip_released = skip_released
+        self.executor = Executor(workers=workers)
+        self.cache = cache
         self.next_tag = ""
-        self.prs = self.get_pr_list()
+        self.records: dict[str, PRRecord] = dict()
+        self.rows: dict[str, dict] = dict()
+        self.type_index: TypeIndex = None
+        self.type_index_prs: list = None
+
+    @cached_property
+    def tag(self) -> str:
+        """
+        The latest tag, looked up on first use.
+        """
+
+        return self.latest_tag()
+
+    @cached_property
+    def prs(self) -> list:
+        """
+        The prs of the next release, looked up on first use.
+        """
+
+        return self.get_pr_list()
 
     def get_today(self) -> str:
         """
-        return today's yyyy-mm-dd
+        return today's yyyy-mm-dd, the day of the recording when a snapshot
+        is replayed
         """
 
+        if snapshot.replaying:
+            return snapshot.today
         current_datetime = datetime.now()
         formatted_date = current_datetime.strftime('%Y-%m-%d')
         return formatted_date
 
+    @tracer.timed
     def latest_tag(self) -> str:
         """
         Return the latest tag.
         """
 
-        cmd = 'gh release list --exclude-drafts --exclude-pre-releases --limit 5 --json tagName --json isLatest'
-        result = run(cmd)
+        cmd = ["gh", "release", "list", "--exclude-drafts", "--exclude-pre-releases", "--limit", "5", "--json", "tagName", "--json", "isLatest"]
+        result = self.executor.run(cmd)
         if result.fine:
-            result_str = str(result.what)
-            result_str = result_str.replace("true","True")
-            result_str = result_str.replace("false","False")
-            response_list: list = eval(result_str)
-            for response in response_list:
-                if response["isLatest"]:
-                    return response["tagName"]
-            raise ValueError(f"Latest tag not found in {response_list}")
+            releases = [ReleaseRecord.from_json(response) for response in loads(result.what)]
+            for release in releases:
+                if release.is_latest:
+                    return release.tag
+            raise ValueError(f"Latest tag not found in {[release.tag for release in releases]}")
         else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
 
+    @tracer.timed
     def get_pr_list(self) -> list:
         """
         Returns a list of prs which will be mentioned in the next release.
+
+        With the cache enabled, the commit of `main` scanned last is kept as
+        a watermark along with the prs found so far, and only the commits
+        merged since are scanned. The whole range since the latest tag is
+        scanned when there is no watermark or it is no longer an ancestor
+        of `main`. A shallow clone is deepened only as far as needed.
         """
 
-        cmd = f'git log {self.tag}..main --oneline'
-        result = run(cmd)
-        if result.fine:
-            response_lines = result.what.split("\n")
-            prs = list()
-            pattern = r'^.+#(\d+).+$'
-            for line in response_lines:
-                match = re.match(pattern, line)
-                if bool(match):
-                    prs.append(match.group(1))
+        watermark = None if self.cache is None else Watermark(self.tag, self.convention)
+        if watermark is not None and watermark.commit and ensure_history(watermark.commit):
+            history = extract_prs(f'{watermark.commit}..main', self.convention)
+            new_prs = set(history.prs)
+            prs = history.prs + [pr for pr in watermark.prs if pr not in new_prs]
+            print(f"Scanned {history.scanned} commits since {watermark.commit[:7]}, {history.matched} matched, {len(history.prs)} new prs, {len(prs)} prs")
+        else:
+            ensure_tag(self.tag)
+            ensure_history(self.tag)
+            history = extract_prs(f'{self.tag}..main', self.convention)
+            prs = history.prs
+            print(f"Scanned {history.scanned} commits, {history.matched} matched, {len(prs)} prs")
+        if watermark is not None:
+            watermark.update(run_checked(["git", "rev-parse", "main"]).strip(), prs)
+            watermark.save()
+
+        if not self.skip_released or not os.path.exists("CHANGELOG.md"):
             return prs
+
+        # Drop the prs which already shipped, e.g. cherry-picked from a release branch
+        from utils.changelog_index import open_index
+        index = open_index()
+        released = set(index.released(prs))
+        index.close()
+        if released:
+            print(f"Skipped {len(released)} prs already released: {', '.join(sorted(released, key=int))}")
+        return [pr for pr in prs if pr not in released]
+
+    def get_pr(self, pr: str) -> PRRecord:
+        """
+        Fetch all the required fields of the pr in one call and cache them.
+        """
+
+        if pr not in self.records:
+            self.records[pr] = fetch_pr(pr, self.executor.run)
+        return self.records[pr]
+
+    @tracer.timed
+    def load_prs(self, prs: list = None, use_cache: bool = True) -> None:
+        """
+        Fetch the records of all the prs (of the release by default) which
+        are not fetched yet. The rows of an earlier run, such as the ones of
+        the rolling draft, are only kept while their pr is unchanged.
+        Fetched records are added to the cache, which is saved by the caller.
+        """
+
+        cache = self.cache if use_cache else None
+        missing = [pr for pr in (self.prs if prs is None else prs) if pr not in self.records]
+
+        # Serve the prs which did not change since their row was built or
+        # their record cached, in ceil(N/100) `updatedAt` queries. A pr
+        # retitled or labeled `ignore` after it was merged is fetched again.
+        if missing and (cache is not None or any(pr in self.rows for pr in missing)):
+            updated_at = load_updated_at(missing, self.executor.run)
+            for pr in missing:
+                if pr in self.rows and self.rows[pr].get("updatedAt") != updated_at[pr]:
+                    del self.rows[pr]
+            missing = [pr for pr in missing if pr not in self.rows]
+            if cache is not None:
+                for pr in missing:
+                    record = cache.get(pr, updated_at[pr])
+                    if record is not None:
+                        self.records[pr] = record
+                missing = [pr for pr in missing if pr not in self.records]
+
+        if self.loader == "graphql":
+            fetched = load_prs_graphql(missing, self.executor.run)
         else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+            fetched = load_prs_gh(missing, self.executor)
+        self.records.update(fetched)
+
+        if cache is not None:
+            for record in fetched.values():
+                cache.put(record)
 
     def get_title_parts(self, pr: str) -> dict:
         """
         Get the type and description from the pr title.
         """
 
-        cmd = f'gh pr view "{pr}" --json title'
-        result = run(cmd)
-        if result.fine:
-            full_title = eval(result.what)["title"]
-            title_split = full_title.split(": ")
-            paranthesis_index = title_split[0].find("(")
-            if paranthesis_index == -1:
-                return {"type": title_split[0], "title": title_split[1].strip()}
-            else:
-                return {"type": title_split[0][:paranthesis_index], "title": title_split[1].strip()}
+        full_title = self.get_pr(pr).title
+        title_split = full_title.split(": ")
+        paranthesis_index = title_split[0].find("(")
+        if paranthesis_index == -1:
+            return {"type": title_split[0], "title": title_split[1].strip()}
         else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+            return {"type": title_split[0][:paranthesis_index], "title": title_split[1].strip()}
 
-    def get_author(self, pr: str) -> bool:
+    def get_author(self, pr: str) -> str:
         """
         Get the author of the pr.
         """
 
-        cmd = f'gh pr view "{pr}" --json author'
-        result = run(cmd)
-        if result.fine:
-            result_str = str(result.what)
-            result_str = result_str.replace("true","True")
-            result_str = result_str.replace("false","False")
-            return eval(result_str)["author"]["login"]
-        else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        return self.get_pr(pr).author
 
-    def get_url(self, pr: str) -> bool:
+    def get_url(self, pr: str) -> str:
         """
         Get the url of the pr.
         """
 
-        cmd = f'gh pr view "{pr}" --json url'
-        result = run(cmd)
-        if result.fine:
-            return eval(result.what)["url"]
-        else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        return self.get_pr(pr).url
 
     def get_jiras(self, pr: str) -> list:
         """
         Get the list or jira tickets mentioned in the pr.
         """
 
-        cmd = f'gh pr view "{pr}" --json body'
-        result = run(cmd)
-        jiras = list()
-        if result.fine:
-            body = eval(result.what)["body"]
-            jira_header_index: int = body.find("### Related Jira Tickets")
-            jira_end_index: int = body.find("-----", jira_header_index)
-            jira_section: str = body[jira_header_index:jira_end_index]
-            jira_section_split: list[str] = jira_section.split("\n")
-            for line in jira_section_split:
-                if line.startswith("- "):
-                    jiras.append(line[2:].strip())
-            return jiras
-        else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        section = self.get_pr(pr).sections.get(JIRA_SECTION)
+        if section is None:
+            return list()
+        jiras = section.jiras
+        return [
+            f"[{jiras[item].id}]({jiras[item].url})" if item in jiras else item[2:].strip()
+            for item in section.items if item.startswith("- ")
+        ]
 
     def get_sops(self, pr: str) -> list:
         """
         Get the list or SOPs mentioned in the prs.
         """
 
-        cmd = f'gh pr view "{pr}" --json body'
-        result = run(cmd)
-        sop = list()
-        if result.fine:
-            body = eval(result.what)["body"]
-            sop_header_index: int = body.find("### Breaking Changes")
-            sop_end_index: int = body.find("-----", sop_header_index)
-            sop_section: str = body[sop_header_index:sop_end_index]
-            sop_section_split: list[str] = sop_section.split("\n")
-            for line in sop_section_split:
-                if not line.startswith("<!") and "### Breaking Changes" not in line:
-                    sop.append(f'{line.strip()}\n')
-        else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
-        return sop
+        section = self.get_pr(pr).sections.get(BREAKING_SECTION)
+        if section is None:
+            return list()
+        return [f'{line.strip()}\n' for line in section.lines if not line.startswith("<!")]
 
     def is_ignore(self, pr: str) -> bool:
         """
         If the pr is labeled with `ignore` then return True, otherwise return False.
         """
 
-        cmd = f'gh pr view "{pr}" --json labels'
-        result = run(cmd)
-        if result.fine:
-            labels_list = eval(result.what)["labels"]
-            for label in labels_list:
-                if label["name"] == "ignore":
-                    return True
-            return False
-        else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        return "ignore" in self.get_pr(pr).labels
+
+    def get_row(self, pr: str) -> dict:
+        """
+        The release notes row of the pr: its type, whether it is ignored,
+        its group, its table line, its SOPs and the `updatedAt` of the pr it
+        was built from.
+        """
+
+        if pr not in self.rows:
+            self.rows[pr] = self.build_row(pr)
+        return self.rows[pr]
+
+    def build_row(self, pr: str) -> dict:
+        """
+        Build the row of the pr from its record
+        """
+
+        title_parts = self.get_title_parts(pr)
+        row = {
+            "type": title_parts["type"], "ignore": self.is_ignore(pr), "group": None, "line": "", "sops": [],
+            "updatedAt": self.get_pr(pr).updated_at
+        }
+        if not row["ignore"]:
+            # Form each part of the line
+            url = self.get_url(pr)
+            type = self.type_mapping[title_parts["type"]]
+            title = title_parts["title"]
+            author = f'@{self.get_author(pr)}'
+            jiras = ", ".join(self.get_jiras(pr))
+            row["line"] = f'| {url} | {type} | {title} | {author} | {jiras} |\n'
+
+            # Decide the group of the line
+            if type in ["breaking"]:
+                row["group"] = "break"
+                row["sops"] = [f'{url}\n'] + self.get_sops(pr)
+            elif type in ["feature", "enhancement"]:
+                row["group"] = "feat"
+            else:
+                row["group"] = "other"
+        return row
 
     def get_next_tag(self, index: int) -> str:
         """
@@ -192,177 +307,180 @@ class Release:
         return 2 if patch
         """
 
-        all_types = list()
-        for pr in self.prs:
-            all_types.append(self.get_title_parts(pr)["type"])
-        if "break" in all_types:
-            return 0
-        elif "feat" in all_types or "enh" in all_types:
-            return 1
-        else:
-            return 2
+        return self.get_type_index().operation()
+
+    def get_type_index(self) -> TypeIndex:
+        """
+        Index the rows of the prs by type, once per list of prs
+        """
 
-    def line_sort_key(self, line: str):
-        line_split = line.split("|")
-        return line_split[2].strip()
+        if self.type_index is None or self.type_index_prs is not self.prs:
+            self.type_index = TypeIndex(self.prs, {pr: self.get_row(pr) for pr in self.prs}, self.type_mapping)
+            self.type_index_prs = self.prs
+        return self.type_index
 
+    @tracer.timed
     def get_release_details(self) -> dict:
         """
         Read the release_template.md file and return the formatted release
         Do the same for CHANGELOG.md and BREAKING_CHANGES.md
         """
 
-        # Get the release template
-        with open(".github/release_template.md") as f:
-            body = f.read()
+        # Get the release template, compiled once
+        template = TemplatePlan.load()
+
+        # Fetch all the prs upfront
+        self.load_prs()
 
         # Get next tag
         self.next_tag = self.get_next_tag(index = self.get_tag_operation())
 
         # Form the changelog_body and breaking_body
-        changelog_body = f'## {self.next_tag} [{self.get_today()}]\n| ID | Type | Title | Author | JIRA |\n| -------------- | -------------- | -------------- | -------------- | -------------- |\n'
-        breaking_body = f'## {self.next_tag} [{self.get_today()}]\n| ID | Type | Title | Author | JIRA |\n| -------------- | -------------- | -------------- | -------------- | -------------- |\n'
-
-        # Replace all template strings in body
-        body = body.replace("NEXT_TAG", self.next_tag)
-        body = body.replace("PREVIOUS_TAG", self.tag)
+        changelog_header = f'## {self.next_tag} [{self.get_today()}]\n| ID | Type | Title | Author | JIRA |\n| -------------- | -------------- | -------------- | -------------- | -------------- |\n'
+        changelog_parts = [changelog_header]
+        breaking_parts = [changelog_header]
 
-        # Group all PRs for the next release notes
+        # Group all PRs for the next release notes, the index already
+        # leaves out the ignored prs and sorts the groups by type
+        index = self.get_type_index()
         groups = {
-            "feat": [],
-            "break": [],
-            "sop": [],
-            "other": []
-        }
-        type_mapping = {
-            "fix": "bugfix",
-            "enh": "enhancement",
-            "feat": "feature",
-            "break": "breaking",
-            "chore": "chore"
+            "feat": [self.rows[pr]["line"] for pr in index.groups["feat"]],
+            "break": [self.rows[pr]["line"] for pr in index.groups["break"]],
+            "sop": [sop for pr in index.groups["break"] for sop in self.rows[pr]["sops"]],
+            "other": [self.rows[pr]["line"] for pr in index.groups["other"]]
         }
-        for pr in self.prs:
-            # Continue if ignore
-            if self.is_ignore(pr):
-                continue
-
-            # Form each part of the line
-            title_parts = self.get_title_parts(pr)
-            url = self.get_url(pr)
-            type = type_mapping[title_parts["type"]]
-            title = title_parts["title"]
-            author = f'@{self.get_author(pr)}'
-            jiras = ""
-            jira_list = self.get_jiras(pr)
-            for jira in jira_list:
-                jiras += jira + ", "
-            jiras = jiras[:-2]
-
-            # Form the line
-            line = f'| {url} | {type} | {title} | {author} | {jiras} |\n'
 
-            # Save each part in its group
-            if type in ["breaking"]:
-                groups["break"].append(line)
-                groups["sop"].append(f'{url}\n')
-                groups["sop"].extend(self.get_sops(pr))
-            elif type in ["feature", "enhancement"]:
-                groups["feat"].append(line)
-            else:
-                groups["other"].append(line)
-
-        # Sort group based on type
-        groups["feat"].sort(key=self.line_sort_key)
-        groups["other"].sort(key=self.line_sort_key)
-
-        # Update each group section in the body
+        # Render every group section of the body in one pass
+        body = template.render({"NEXT_TAG": self.next_tag, "PREVIOUS_TAG": self.tag}, groups)
         for key, value in groups.items():
             if value != []:
-                body_end_identifier = f'<!--- {key} body end -->'
-                body_end_identifier_index = body.find(body_end_identifier)
-                lines = ""
-                for line in value:
-                    lines += line
-                body = body[:body_end_identifier_index] + lines + body[body_end_identifier_index:]
                 if key in ["feat", "break", "other"]:
-                    changelog_body += lines
+                    changelog_parts.extend(value)
                 if key in ["break", "sop"]:
                     if key == "sop":
-                        breaking_body += "\n"
-                    breaking_body += lines
-            else:
-                # Remove the section as there are no changes
-                header_start_identifier = f'<!--- {key} header start -->'
-                body_end_identifier = f'<!--- {key} body end -->'
-                header_start_identifier_index = body.find(header_start_identifier)
-                body_end_identifier_index = body.find(body_end_identifier)
-                body = body[:header_start_identifier_index] + body[body_end_identifier_index:]
+                        breaking_parts.append("\n")
+                    breaking_parts.extend(value)
+        changelog_body = "".join(changelog_parts)
+        breaking_body = "".join(breaking_parts)
 
         # Return formatted release body
         return {"release": body, "changelog": changelog_body, "breaking": breaking_body}
 
+    def iter_rows(self, budget: int):
+        """
+        Yield the row of every pr of the release in order, fetching as many
+        prs at a time as fit in `budget` bytes, going by the largest record
+        fetched so far, and dropping each record once its row is built.
+
+        The record cache would keep every record until it is saved, so it
+        is left out; only the rows of the rolling draft are reused.
+        """
+
+        largest = 0
+        start = 0
+        while start < len(self.prs):
+            prs = self.prs[start:start + chunk_size(budget, largest or RECORD_ESTIMATE)]
+            start += len(prs)
+            self.load_prs(prs, use_cache=False)
+            largest = max(largest, record_size(self.records[pr] for pr in prs if pr in self.records))
+            for pr in prs:
+                row = self.rows[pr] if pr in self.rows else self.build_row(pr)
+                self.records.pop(pr, None)
+                yield pr, row
+
+    @tracer.timed
+    def stream_release_details(self, directory: str, budget: int) -> dict:
+        """
+        Same as `get_release_details`, for releases too large to hold in
+        memory. The prs stream through fetch, row and group stages. Half of
+        `budget` bytes goes to the fetched records and the four groups share
+        the other half, each kept in a `SortedSpill` within an eighth.
+
+        The release notes, changelog and breaking changes are written to
+        files in `directory`. Returns their paths, the breaking changes
+        being None when there are none.
+        """
+
+        template = TemplatePlan.load()
+        groups = {key: SortedSpill(budget // 8, directory) for key in ["feat", "break", "sop", "other"]}
+        counts = dict()
+        try:
+            for sequence, (pr, row) in enumerate(self.iter_rows(budget // 2)):
+                if row["ignore"]:
+                    continue
+                counts[row["type"]] = counts.get(row["type"], 0) + 1
+                if row["group"] == "break":
+                    # Breaking changes keep the order of the prs
+                    groups["break"].add([sequence], [row["line"]])
+                    groups["sop"].add([sequence], row["sops"])
+                else:
+                    groups[row["group"]].add([self.type_mapping[row["type"]], sequence], [row["line"]])
+
+            self.next_tag = self.get_next_tag(index = bump_operation(counts))
+            changelog_header = f'## {self.next_tag} [{self.get_today()}]\n| ID | Type | Title | Author | JIRA |\n| -------------- | -------------- | -------------- | -------------- | -------------- |\n'
+
+            paths = {key: os.path.join(directory, f"{key}.md") for key in ["release", "changelog", "breaking"]}
+            with open(paths["release"], "w") as f:
+                template.write(f, {"NEXT_TAG": self.next_tag, "PREVIOUS_TAG": self.tag}, groups)
+            with open(paths["changelog"], "w") as f:
+                f.write(changelog_header)
+                for key in ["feat", "break", "other"]:
+                    f.writelines(groups[key])
+            if groups["break"]:
+                with open(paths["breaking"], "w") as f:
+                    f.write(changelog_header)
+                    f.writelines(groups["break"])
+                    f.write("\n")
+                    f.writelines(groups["sop"])
+            else:
+                paths["breaking"] = None
+        finally:
+            for spill in groups.values():
+                spill.close()
+        return paths
+
+    @tracer.timed
     def update_changelog(self, body) -> None:
         """
         If the CHANGELOG.md file does not exist, create it.
         If it exists, then update the changelog for the next release
         """
 
+        # The index is brought in step with CHANGELOG.md before the release
+        # is inserted, and then only indexes the new release
+        from utils.changelog_index import open_index
+        index = open_index()
+
+        initial = ""
         if not os.path.exists("CHANGELOG.md"):
-            changelog = self.create_changelog()
-        else:
-            with open("CHANGELOG.md") as f:
-                changelog = f.read()
-        changelog_heading = "# Changelog\n"
-        insert_index = len(changelog_heading) + 1
-        changelog = changelog[:insert_index] + body + changelog[insert_index:]
-        with open("CHANGELOG.md", "w") as f:
-            f.write(changelog)
+            initial = self.create_changelog()
+        insert_section("CHANGELOG.md", "# Changelog\n", body, initial)
+
+        index.add_release(body)
+        index.mark()
+        index.close()
 
+    @tracer.timed
     def create_changelog(self):
         """
         Create the changelog file for the first time
         """
 
-        # Get past tags (limit=240)
-        cmd = 'gh release list --limit 240 --exclude-drafts --exclude-pre-releases --json publishedAt --json tagName'
-        result = run(cmd)
-        if result.fine:
-            response = eval(result.what)
-            changelog = ""
-            for tag in response:
-                pattern = r'^(\w*_*)(\d+\.\d+\.\d+)$'
-                match = re.match(pattern, tag["tagName"])
-                if bool(match):
-                    changelog += f'<details><summary>{tag["tagName"]} [{tag["publishedAt"][:10]}]</summary>\n\n'
-                    cmd_get_pr_body = f'gh release view "{tag["tagName"]}" --json body'
-                    result_get_pr_body = run(cmd_get_pr_body)
-                    if result_get_pr_body.fine:
-                        changelog += eval(result_get_pr_body.what)["body"] + "\n\n</details>\n\n---\n\n"
-                    else:
-                        raise ValueError(f"Command failed: {cmd_get_pr_body}\nError: {result_get_pr_body.what}")
-            changelog = "# Changelog\n\n" + "## Legacy Release Notes\n" + changelog
-            return changelog
-        else:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        # Get all the past releases
+        changelog = bootstrap_changelog(self.executor.run)
+        changelog = "# Changelog\n\n" + "## Legacy Release Notes\n" + changelog
+        return changelog
 
+    @tracer.timed
     def update_breaking(self, body) -> None:
         """
         If the BREAKING.md file does not exist, create it.
         If it exists, then update the breaking changes for the next release
         """
 
-        if not os.path.exists("BREAKING.md"):
-            breaking = "# Breaking Changes\n"
-        else:
-            with open("BREAKING.md") as f:
-                breaking = f.read()
-        breaking_heading = "# Breaking Changes\n"
-        insert_index = len(breaking_heading) + 1
-        if body.strip().endswith("-------------- |"):
+        if isinstance(body, str) and body.strip().endswith("-------------- |"):
             return
-        breaking = breaking[:insert_index] + body + breaking[insert_index:]
-        with open("BREAKING.md", "w+") as f:
-            f.write(breaking)
+        insert_section("BREAKING.md", "# Breaking Changes\n", body, "# Breaking Changes\n")
 
     def release(self) -> None:
         """
@@ -370,95 +488,224 @@ class Release:
         """
         pass
 
-if __name__ == "__main__":
+def notes(release: Release, dry_run: bool = False, memory_budget: int = None) -> None:
+    """
+    Write the release notes, changelog and breaking changes for the next
+    release, push them to a new branch and open the release pull request.
+    A dry run only writes the release notes in RELEASE.md.
+
+    With a `memory_budget` in bytes, the notes are rendered to files by
+    `stream_release_details` instead of in memory.
+    """
+
+    if memory_budget is not None:
+        with tempfile.TemporaryDirectory(prefix="rng-") as directory, ExitStack() as files:
+            paths = release.stream_release_details(directory, memory_budget)
+            release_details = {key: files.enter_context(open(path)) if path else None for key, path in paths.items()}
+            write_notes(release, release_details, dry_run)
+    else:
+        write_notes(release, release.get_release_details(), dry_run)
 
-    parser = argparse.ArgumentParser(description='Fetch Pull Request number')
-    parser.add_argument('action', help='notes or release')
-    args = parser.parse_args()
 
-    release = Release()
+def write_notes(release: Release, release_details: dict, dry_run: bool) -> None:
+    """
+    The rest of `notes` once the release details are rendered, either as
+    strings or as open files
+    """
 
-    if args.action == "notes":
-        release_details = release.get_release_details()
+    if dry_run:
+        write_release_notes(release_details["release"])
+        print(f"Dry run: wrote the release notes of {release.next_tag} in RELEASE.md")
+        return
 
-        # write the changelog in CHANGELOG.md
-        release.update_changelog(release_details["changelog"])
+    # write the changelog in CHANGELOG.md
+    release.update_changelog(release_details["changelog"])
 
-        # write the breaking changes in BREAKING.md
+    # write the breaking changes in BREAKING.md
+    if release_details["breaking"] is not None:
         release.update_breaking(release_details["breaking"])
 
+    from utils.tagfiles import load_prerelease_ids, load_tag_files, update_tag_files
+    with tracer.phase("write_files"):
         # write the release notes for the next release in RELEASE.md
-        with open("RELEASE.md", "w") as f:
-            f.write(release_details["release"])
-
-        #TODO: update any additional files with the new release tag
-        additional_files = ["releases.yaml"]
-        for file_name in additional_files:
-            with open(file_name) as f:
-                body = f.read()
-            body = body.replace(f'{release.tag}', f'{release.next_tag}')
-            with open(file_name, "w") as f:
-                f.write(body)
-
-        # Configure the bot
-        cmd = f'git config --local user.email "action@github.com"'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
-        cmd = f'git config --local user.name "GitHub Action"'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        write_release_notes(release_details["release"])
 
-        # Add the changes
-        cmd = 'git add .'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        # update the additional files listed in .github/release_files.json with the new release tag
+        updated = update_tag_files(release.tag, release.next_tag, load_tag_files(), load_prerelease_ids())
+        changed = [result for result in updated if result.replacements]
+        print(f"Updated the release tag in {len(changed)}/{len(updated)} additional files")
 
-        # Create a branch
+    with tracer.phase("push"):
+        # Commit the changes on top of main without checking out a branch
         branch = f'release-{release.next_tag}'
-        cmd = f'git checkout -b {branch}'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        run_checked(["git", "add", "."])
+        tree = run_checked(["git", "write-tree"]).strip()
+        commit = run_checked([
+            "git", "-c", "user.name=GitHub Action", "-c", "user.email=action@github.com",
+            "commit-tree", tree, "-p", "HEAD", "-m", branch
+        ]).strip()
 
-        # Commit the changes
-        cmd = f'git commit -m "{branch}"'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+        # Push the commit as the release branch
+        run_checked(["git", "push", "origin", f"{commit}:refs/heads/{branch}"])
 
-        # Push the changes
-        cmd = f'git push --set-upstream origin {branch}'
-        result = run(cmd)
+    with tracer.phase("pull_request"):
+        # Create a pull request
+        cmd = [
+            "gh", "pr", "create", "--base", "main", "--head", branch, "--title", f"chore: {branch}",
+            "--label", "release,ignore", "--body-file", ".github/pull_request_template.md"
+        ]
+        result = release.executor.run(cmd)
         if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
 
-        # Checkout to main branch
-        cmd = f'git checkout main'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
 
-        # Create a pull request
-        cmd = f'gh pr create --base main --head {branch} --title "chore: {branch}" --label release,ignore --body-file .github/pull_request_template.md'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+def write_release_notes(body: Union[str, IO[str]]) -> None:
+    with open("RELEASE.md", "w") as f:
+        if isinstance(body, str):
+            f.write(body)
+        else:
+            shutil.copyfileobj(body, f)
 
-    else:
-        branch_name = release.get_title_parts(args.action)["title"]
-        release_tag = branch_name[8:]
 
-        # Checkout to branch_name
-        cmd = f'git checkout {branch_name}'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+def draft(release: Release) -> None:
+    """
+    Bring the rolling draft of the next release up to date with `main` and
+    re-render its notes. Only the new prs are fetched.
 
-        # Create the release
-        cmd = f'gh release create {release_tag} --notes-file RELEASE.md --title "{release_tag}"'
-        result = run(cmd)
-        if not result.fine:
-            raise ValueError(f"Command failed: {cmd}\nError: {result.what}")
+    The prs come from `get_pr_list`, which only scans the commits merged
+    since the watermark of the previous run, so the pushes of runs which
+    were skipped or cancelled are drafted as well.
+    """
+
+    rolling = Draft(release.tag)
+    release.rows = rolling.rows
+    rolling.update(release.prs)
+    new_prs = [pr for pr in rolling.prs if pr not in rolling.rows]
+    release.prs = rolling.prs
+
+    release_details = release.get_release_details()
+    rolling.save()
+    with open(DRAFT_NOTES_FILE, "w") as f:
+        f.write(release_details["release"])
+    print(f"Drafted {len(new_prs)} new prs, {len(rolling.prs)} prs in the draft of {release.next_tag}")
+
+
+def publish(release: Release, pr: str) -> None:
+    """
+    Create the GitHub release once the release pull request is merged
+    """
+
+    branch_name = release.get_title_parts(pr)["title"]
+    release_tag = branch_name[8:]
+
+    # Checkout to branch_name
+    run_checked(["git", "checkout", branch_name])
+
+    # Create the release
+    cmd = ["gh", "release", "create", release_tag, "--notes-file", "RELEASE.md", "--title", release_tag]
+    result = release.executor.run(cmd)
+    if not result.fine:
+        raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+
+
+def query(args: argparse.Namespace) -> None:
+    """
+    Print the released prs matching the filters, newest release first
+    """
+
+    from utils.changelog_index import open_index
+    index = open_index()
+    entries = index.find(pr=args.pr, jira=args.jira, author=args.author, type=args.type, release=args.release)
+    index.close()
+    for entry in entries:
+        print(f"{entry.release} [{entry.date}] #{entry.pr} {entry.type} @{entry.author} {entry.title}")
+    if not entries:
+        raise SystemExit("No released pr matches")
+
+
+def reindex() -> None:
+    """
+    Rebuild the changelog index from CHANGELOG.md
+    """
+
+    from utils.changelog_index import CHANGELOG_INDEX, ChangelogIndex
+    index = ChangelogIndex()
+    print(f"Indexed {index.rebuild()} prs of CHANGELOG.md in {CHANGELOG_INDEX}")
+    index.close()
+
+
+def analytics(args: argparse.Namespace) -> None:
+    """
+    Print the release analytics report of the changelog
+    """
+
+    from utils.analytics import ChangelogColumns, render_csv, render_markdown
+    columns = ChangelogColumns.from_changelog(args.changelog)
+    print(render_markdown(columns) if args.format == "markdown" else render_csv(columns, args.table), end="")
+
+
+def main(argv: list = None) -> None:
+
+    parser = argparse.ArgumentParser(description='Fetch Pull Request number')
+    parser.add_argument('action', help='notes, draft, query, reindex, analytics or the number of the merged release pr')
+    parser.add_argument('--loader', choices=["gh", "graphql"], default="gh", help='fetch prs one by one (gh) or in batches (graphql)')
+    parser.add_argument('--workers', type=int, default=8, help='maximum number of concurrent gh calls')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the pr metadata cache')
+    parser.add_argument('--convention', choices=list(CONVENTIONS), default="auto", help='how merged prs appear in git log')
+    parser.add_argument('--pr', type=int, help='released pr number (query only)')
+    parser.add_argument('--jira', help='Jira ticket, e.g. PLAT-4742 (query only)')
+    parser.add_argument('--author', help='GitHub login of the pr author (query only)')
+    parser.add_argument('--type', choices=list(Release.type_mapping.values()), help='pr type (query only)')
+    parser.add_argument('--release', help='release tag (query only)')
+    parser.add_argument('--record', metavar='FILE', help='save every gh/git result in a snapshot, e.g. snapshot.json.gz')
+    parser.add_argument('--replay', metavar='FILE', help='answer every gh/git command from a snapshot, implies --dry-run')
+    parser.add_argument('--dry-run', action='store_true', help='only write RELEASE.md, without git, push or pr (notes only)')
+    parser.add_argument('--format', choices=["markdown", "csv"], default="markdown", help='report format (analytics only)')
+    parser.add_argument('--table', choices=["releases", "types", "authors"], default="releases", help='table of the csv report (analytics only)')
+    parser.add_argument('--changelog', default="CHANGELOG.md", help='changelog to report on (analytics only)')
+    parser.add_argument('--memory-budget', type=float, metavar='MB', help='stream the prs and spill large groups to disk above this budget (notes only)')
+    parser.add_argument('--skip-released', action='store_true', help='leave out the prs already in a release of CHANGELOG.md, e.g. cherry-picks (notes and draft)')
+    args = parser.parse_args(argv)
+
+    if args.action == "query":
+        query(args)
+        return
+    if args.action == "analytics":
+        analytics(args)
+        return
+    if args.action == "reindex":
+        reindex()
+        return
+
+    if args.replay:
+        snapshot.replay_from(args.replay)
+    elif args.record:
+        snapshot.record_to(args.record)
+
+    # A snapshot holds every command, so nothing may come from the cache
+    cache = None if args.no_cache or snapshot.mode else PRCache()
+    # Neither may the prs depend on the local changelog index, which a dry
+    # run should not build either
+    skip_released = args.skip_released and not (args.dry_run or snapshot.mode)
+    release = Release(loader=args.loader, workers=args.workers, cache=cache, convention=args.convention, skip_released=skip_released)
+
+    try:
+        if args.action == "notes":
+            if cache is not None:
+                # Reuse the rows of the rolling draft, only fetching the prs it misses
+                release.rows = Draft(release.tag).rows
+            memory_budget = None if args.memory_budget is None else int(args.memory_budget * (1 << 20))
+            notes(release, dry_run=args.dry_run or snapshot.replaying, memory_budget=memory_budget)
+        elif args.action == "draft":
+            draft(release)
+        else:
+            publish(release, args.action)
+    finally:
+        # Saved once, however many batches the records were fetched in
+        if cache is not None:
+            cache.save()
+        snapshot.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+script: rng.py
+
+Single entry point for all the workflows of the release-note-generator.
+
+    rng.py [--trace FILE] [--chrome-trace FILE] notes [options]           create the release notes and the release pull request
+    rng.py [--trace FILE] [--chrome-trace FILE] draft [options]           add the newly merged prs to the rolling draft of the release notes
+    rng.py [--trace FILE] [--chrome-trace FILE] release <pr> [options]    create the GitHub release for a merged release pull request
+    rng.py [--trace FILE] [--chrome-trace FILE] validate [pr] [options]   validate pull requests
+    rng.py [--trace FILE] [--chrome-trace FILE] fanout [repos] [options]  create the release notes of many repositories at once
+
+Only the modules needed by the command are imported, and a report of the
+time spent starting up and running the command, along with the `gh`/`git`
+calls it made, is printed on stderr.
+
+`--trace` writes the phase timings and the calls per command type as JSON,
+`--chrome-trace` writes every phase and call in the Chrome trace format.
+"""
+
+import time
+
+STARTED = time.perf_counter()
+
+import sys
+import importlib
+from utils.trace import tracer
+
+# command: (module, arguments prepended for its main())
+COMMANDS = {
+    "notes": ("releaser", ["notes"]),
+    "draft": ("releaser", ["draft"]),
+    "release": ("releaser", []),
+    "query": ("releaser", ["query"]),
+    "reindex": ("releaser", ["reindex"]),
+    "analytics": ("releaser", ["analytics"]),
+    "validate": ("pr_validator", []),
+    "fanout": ("fanout", []),
+}
+TRACE_OPTIONS = ["--trace", "--chrome-trace"]
+
+
+def main(argv: list) -> None:
+
+    outputs = dict()
+    while len(argv) >= 2 and argv[0] in TRACE_OPTIONS:
+        outputs[argv[0]] = argv[1]
+        argv = argv[2:]
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    command, args = argv[0], argv[1:]
+
+    phases = [("startup", time.perf_counter() - STARTED)]
+    start = time.perf_counter()
+    module_name, prefix = COMMANDS[command]
+    try:
+        with tracer.phase("imports"):
+            module = importlib.import_module(module_name)
+        phases.append(("imports", time.perf_counter() - start))
+        start = time.perf_counter()
+        # `release <pr>` is `releaser.py <pr>`, `notes` is `releaser.py notes`
+        with tracer.phase(command):
+            module.main(prefix + args)
+    finally:
+        phases.append((command, time.perf_counter() - start))
+        report = ", ".join(f"{name}: {seconds * 1000:.1f} ms" for name, seconds in phases)
+        print(f"[rng] {report}, total: {(time.perf_counter() - STARTED) * 1000:.1f} ms", file=sys.stderr)
+        for line in tracer.report().splitlines():
+            print(f"[rng] {line}", file=sys.stderr)
+        if "--trace" in outputs:
+            tracer.write(outputs["--trace"])
+        if "--chrome-trace" in outputs:
+            tracer.write(outputs["--chrome-trace"], chrome=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import pytest
+
+tests = os.path.dirname(os.path.realpath(__file__))
+scripts = os.path.dirname(tests)
+sys.path.insert(0, scripts)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(scripts))
+PULLS_FIXTURE = os.path.join(scripts, "fixtures", "pulls.json")
+
+
+@pytest.fixture
+def repo_root(monkeypatch) -> str:
+    """
+    Run the test from the repository root, where the scripts find
+    `.github/pr_rules.json` and `.github/release_template.md`
+    """
+
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
+
+
+@pytest.fixture
+def pulls() -> dict:
+    with open(PULLS_FIXTURE) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def write_fixtures(tmp_path):
+    """
+    Write fixtures for `LocalTransport` and return their path
+    """
+
+    def write(fixtures: dict, name: str = "fixtures.json") -> str:
+        path = tmp_path / name
+        path.write_text(json.dumps(fixtures))
+        return str(path)
+    return write
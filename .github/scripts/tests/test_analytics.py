@@ -0,0 +1,50 @@
+import pytest
+from releaser import main
+from utils.analytics import ChangelogColumns, render_csv, render_markdown, report_tables
+from utils.changelog_index import parse_changelog
+from tests.test_changelog_index import CHANGELOG
+
+
+@pytest.fixture
+def columns() -> ChangelogColumns:
+    return ChangelogColumns.from_entries(parse_changelog(CHANGELOG.splitlines(keepends=True)))
+
+
+def test_columns_are_dictionary_encoded(columns):
+    assert len(columns) == 3
+    assert columns.releases == ["1.1.0", "1.0.0"]
+    assert columns.authors == ["author3", "author2", "author1"]
+    assert list(columns.release) == [0, 0, 1]
+    assert [columns.types[code] for code in columns.type] == ["breaking", "bugfix", "feature"]
+    assert list(columns.jiras) == [1, 0, 0]
+
+
+def test_report_tables(columns):
+    tables = report_tables(columns)
+    assert tables["releases"][1] == [
+        ["1.1.0", "2024-08-12", 2, 0, 0, 1, 1, 0, 1, 7],
+        ["1.0.0", "2024-08-05", 1, 1, 0, 0, 0, 0, 1, ""],
+    ]
+    assert tables["types"][1] == [
+        ["feature", 1, "33.3%", 1],
+        ["enhancement", 0, "0.0%", 0],
+        ["bugfix", 1, "33.3%", 1],
+        ["breaking", 1, "33.3%", 1],
+        ["chore", 0, "0.0%", 0],
+    ]
+    assert tables["authors"][1] == [["@author1", 1, 1, 0], ["@author2", 1, 1, 0], ["@author3", 1, 1, 1]]
+
+
+def test_render(columns):
+    assert render_csv(columns, "types").splitlines()[:2] == ["Type,PRs,Share,Releases", "feature,1,33.3%,1"]
+    markdown = render_markdown(columns)
+    assert "- Releases: 2 (2024-08-05 to 2024-08-12)\n" in markdown
+    assert "- Breaking changes: 1 prs in 1 of 2 releases\n" in markdown
+    # An empty changelog still renders
+    assert "- Releases: 0\n" in render_markdown(ChangelogColumns())
+
+
+def test_unknown_table_is_rejected(capsys):
+    with pytest.raises(SystemExit):
+        main(["analytics", "--format", "csv", "--table", "jiras"])
+    assert "invalid choice: 'jiras'" in capsys.readouterr().err
@@ -0,0 +1,77 @@
+import json
+import time
+from utils.cache import PRCache
+from utils.records import PRRecord
+
+
+def record(number: int, updated_at: str = "2024-08-01T10:00:00Z", title: str = "feat(PLAT-1): title") -> PRRecord:
+    return PRRecord(str(number), title, "author", f"https://github.com/owner/repo/pull/{number}", "body", ["type/feature"], "PLAT-1-branch", updated_at)
+
+
+def lines(path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_record_is_served_while_unchanged(tmp_path):
+    path = str(tmp_path / "prs.jsonl")
+    cache = PRCache(path)
+    cache.put(record(1))
+    cache.save()
+
+    cache = PRCache(path)
+    cached = cache.get("1", "2024-08-01T10:00:00Z")
+    assert cached.title == "feat(PLAT-1): title" and cached.labels == ["type/feature"]
+    assert cache.get("1", "2024-08-02T10:00:00Z") is None
+    assert cache.get("2", "2024-08-01T10:00:00Z") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_first_lookup_scans_and_new_records_are_appended(tmp_path):
+    path = str(tmp_path / "prs.jsonl")
+    cache = PRCache(path)
+    for number in range(1, 4):
+        cache.put(record(number))
+    cache.save()
+
+    cache = PRCache(path)
+    assert cache.get("2", "2024-08-01T10:00:00Z") is not None
+    assert cache._entries is None
+    # A retitled pr is appended, its last line wins
+    cache.put(record(2, "2024-08-05T10:00:00Z", "feat(PLAT-1): new title"))
+    cache.save()
+    assert [entry["number"] for entry in lines(path)] == ["1", "2", "3", "2"]
+    assert PRCache(path).get("2", "2024-08-05T10:00:00Z").title == "feat(PLAT-1): new title"
+
+
+def test_read_in_full_is_compacted_and_evicted(tmp_path):
+    path = str(tmp_path / "prs.jsonl")
+    cache = PRCache(path)
+    for number in range(1, 6):
+        cache.put(record(number))
+    cache.save()
+    with open(path) as f:
+        entries = [json.loads(line) for line in f]
+    # The first pr was cached long ago
+    entries[0]["cachedAt"] = time.time() - 100 * 24 * 60 * 60
+    with open(path, "w") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+    cache = PRCache(path, max_entries=3, max_age_days=90)
+    assert cache.get("2", "2024-08-01T10:00:00Z") is not None
+    assert cache.get("3", "2024-08-01T10:00:00Z") is not None
+    assert cache._entries is not None
+    cache.save()
+    numbers = {entry["number"] for entry in lines(path)}
+    assert "1" not in numbers and len(numbers) == 3
+
+
+def test_partial_lines_are_skipped(tmp_path):
+    path = tmp_path / "prs.jsonl"
+    cache = PRCache(str(path))
+    cache.put(record(1))
+    cache.save()
+    with open(path, "a") as f:
+        f.write('{"number": "2", "updatedAt": ')
+    assert PRCache(str(path)).get("1", "2024-08-01T10:00:00Z") is not None
+    assert PRCache(str(path)).get("2", "2024-08-01T10:00:00Z") is None
@@ -0,0 +1,57 @@
+import os
+import json
+import pytest
+from types import SimpleNamespace
+from utils.changelog import bootstrap_changelog
+from utils.loader import LocalTransport
+
+
+class Interrupted(LocalTransport):
+    """
+    Fail the query after `pages` pages were served
+    """
+
+    def __init__(self, fixture_path: str, pages: int):
+        super().__init__(fixture_path)
+        self.pages = pages
+
+    def __call__(self, cmd):
+        if len(self.calls) == self.pages:
+            self.calls.append(cmd)
+            return SimpleNamespace(fine=False, what="HTTP 502: Bad Gateway")
+        return super().__call__(cmd)
+
+
+def test_bootstrap_skips_drafts_and_prereleases(tmp_path, pulls, write_fixtures):
+    changelog = bootstrap_changelog(LocalTransport(write_fixtures(pulls)), str(tmp_path / "bootstrap.json"), page_size=3)
+    assert [line for line in changelog.splitlines() if line.startswith("<details>")] == [
+        "<details><summary>1.0.1 [2024-07-26]</summary>",
+        "<details><summary>1.0.0 [2024-07-19]</summary>",
+        "<details><summary>0.9.0 [2024-07-12]</summary>",
+    ]
+    # Nothing is left behind once the bootstrap is done
+    assert sorted(os.listdir(tmp_path)) == [".gitignore", "fixtures.json"]
+
+
+def test_bootstrap_resumes_from_the_checkpoint(tmp_path, pulls, write_fixtures):
+    fixtures = write_fixtures(pulls)
+    checkpoint = str(tmp_path / "bootstrap.json")
+    expected = bootstrap_changelog(LocalTransport(fixtures), str(tmp_path / "fresh.json"), page_size=1)
+
+    with pytest.raises(ValueError, match="Bad Gateway"):
+        bootstrap_changelog(Interrupted(fixtures, pages=2), checkpoint, page_size=1)
+    with open(checkpoint) as f:
+        state = json.load(f)
+    assert state["cursor"] == "2" and not state["done"]
+    notes_path = str(tmp_path / "bootstrap.md")
+    assert os.path.getsize(notes_path) == state["length"]
+
+    # Whatever was written after the checkpoint is dropped on resume
+    with open(notes_path, "a") as f:
+        f.write("<details><summary>half written")
+    transport = LocalTransport(fixtures)
+    assert bootstrap_changelog(transport, checkpoint, page_size=1) == expected
+    # Only the pages after the checkpoint are fetched again
+    assert len(transport.calls) == 2
+    assert "after=2" in transport.calls[0]
+    assert not os.path.exists(checkpoint) and not os.path.exists(notes_path)
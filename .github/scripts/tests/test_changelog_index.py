@@ -0,0 +1,95 @@
+import os
+import subprocess
+import pytest
+from releaser import Release
+from utils.changelog_index import CHANGELOG_INDEX, open_index, parse_changelog
+
+HEADER = "| ID | Type | Title | Author | JIRA |\n| -------------- | -------------- | -------------- | -------------- | -------------- |\n"
+
+
+def row(pr: int, type: str = "feature", jira: str = "") -> str:
+    return f"| https://github.com/owner/repo/pull/{pr} | {type} | title {pr} | @author{pr} | {jira} |\n"
+
+
+CHANGELOG = (
+    "# Changelog\n\n"
+    "## 1.1.0 [2024-08-12]\n" + HEADER
+    + row(3, "breaking", "[PLAT-3](https://example.atlassian.net/browse/PLAT-3)") + row(2, "bugfix") + "\n"
+    + "## Notes\n" + HEADER + row(90) + "\n"
+    + "## 1.0.0 [2024-08-05]\n" + HEADER + row(1) + "\n"
+    + "## Legacy Release Notes\n"
+    + "### 0.9.0\n" + HEADER + row(80) + "\n"
+    + "## 0.8.0 [2024-01-01]\n" + HEADER + row(70) + "\n"
+)
+
+
+def test_parse_changelog_keeps_rows_under_their_release():
+    entries = list(parse_changelog(CHANGELOG.splitlines(keepends=True)))
+    assert [(entry.pr, entry.release, entry.date) for entry in entries] == [
+        (3, "1.1.0", "2024-08-12"), (2, "1.1.0", "2024-08-12"), (1, "1.0.0", "2024-08-05")
+    ]
+    assert entries[0].type == "breaking"
+    assert entries[0].author == "author3"
+    assert entries[0].jiras == ["PLAT-3"]
+
+
+def test_index_is_rebuilt_when_the_changelog_changes(tmp_path):
+    changelog = tmp_path / "CHANGELOG.md"
+    changelog.write_text(CHANGELOG)
+    path = str(tmp_path / ".cache" / "changelog.sqlite")
+
+    index = open_index(path, str(changelog))
+    assert [entry.release for entry in index.find(pr=3)] == ["1.1.0"]
+    assert index.find(pr=80) == [] and index.find(pr=90) == []
+    assert index.find(jira="PLAT-3")[0].pr == 3
+    assert index.released(["1", "4", "2"]) == ["1", "2"]
+    index.close()
+
+    # A hand edit of CHANGELOG.md is picked up on the next open
+    changelog.write_text(CHANGELOG.replace(row(2, "bugfix"), row(2, "bugfix") + row(4, "chore")))
+    index = open_index(path, str(changelog))
+    assert [entry.type for entry in index.find(release="1.1.0")] == ["chore", "breaking", "bugfix"]
+    index.close()
+
+
+def test_add_release_marks_the_index(tmp_path):
+    changelog = tmp_path / "CHANGELOG.md"
+    changelog.write_text(CHANGELOG)
+    path = str(tmp_path / "changelog.sqlite")
+    index = open_index(path, str(changelog))
+    section = "## 1.2.0 [2024-08-19]\n" + HEADER + row(5) + "\n"
+    changelog.write_text(CHANGELOG.replace("# Changelog\n\n", "# Changelog\n\n" + section))
+    assert index.add_release(section) == 1
+    index.mark(str(changelog))
+    digest = index.digest
+    index.close()
+
+    index = open_index(path, str(changelog))
+    assert index.digest == digest
+    assert index.find(pr=5)[0].release == "1.2.0"
+    index.close()
+
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo, check=True, capture_output=True
+    )
+
+
+@pytest.mark.parametrize("skip_released, prs", [(False, ["6", "2"]), (True, ["6"])])
+def test_released_prs_are_only_skipped_when_asked(tmp_path, monkeypatch, skip_released, prs):
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "chore: release 1.1.0")
+    git(tmp_path, "tag", "1.1.0")
+    # #2 was cherry-picked from a release branch and shipped in 1.1.0
+    for subject in ["fix: second (#2)", "feat: sixth (#6)"]:
+        git(tmp_path, "commit", "-q", "--allow-empty", "-m", subject)
+    (tmp_path / "CHANGELOG.md").write_text(CHANGELOG)
+    monkeypatch.chdir(tmp_path)
+
+    release = Release(workers=1, skip_released=skip_released)
+    release.tag = "1.1.0"
+    assert release.get_pr_list() == prs
+    # The index is only built when it is used
+    assert os.path.exists(CHANGELOG_INDEX) == skip_released
@@ -0,0 +1,52 @@
+import io
+import json
+import pytest
+from types import SimpleNamespace
+from utils import decode
+from utils.decode import iter_array, loads
+from utils.loader import LocalTransport, load_open_prs
+
+
+def test_loads_strict_json():
+    assert loads('{"title": "feat: x", "labels": [{"name": "ignore"}]}') == {"title": "feat: x", "labels": [{"name": "ignore"}]}
+    assert loads(b'[1, 2]') == [1, 2]
+    # Responses which used to go through eval() are rejected
+    for payload in ["{'title': 'x'}", '{"draft": True}', "__import__('os')"]:
+        with pytest.raises(ValueError):
+            loads(payload)
+
+
+def test_large_payloads_use_orjson_when_installed(monkeypatch):
+    calls = list()
+    fake = SimpleNamespace(loads=lambda payload: calls.append(payload) or json.loads(payload))
+    monkeypatch.setattr(decode, "_orjson", fake)
+    monkeypatch.setattr(decode, "ORJSON_MIN_SIZE", 10)
+    assert loads("[1]") == [1]
+    assert loads("[1, 2, 3, 4, 5]") == [1, 2, 3, 4, 5]
+    assert calls == ["[1, 2, 3, 4, 5]"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+def test_iter_array_across_chunk_boundaries(chunk_size):
+    elements = [12345, -1.5e10, "a, ]string", {"nested": [1, {"b": None}]}, [], True, None, "é"]
+    text = " \n[ " + ",\n  ".join(json.dumps(element) for element in elements) + " ]\n"
+    assert list(iter_array(io.StringIO(text), chunk_size)) == elements
+
+
+def test_iter_array_edges():
+    assert list(iter_array(io.StringIO("[]"))) == []
+    assert list(iter_array(io.StringIO("[ 1 ]"), 1)) == [1]
+    with pytest.raises(ValueError, match="Expected a JSON array"):
+        list(iter_array(io.StringIO('{"a": 1}')))
+    with pytest.raises(ValueError):
+        list(iter_array(io.StringIO('[{"a": 1}, {"b": ')))
+    with pytest.raises(ValueError, match="Unexpected end"):
+        list(iter_array(io.StringIO("[1, 2")))
+
+
+def test_open_prs_are_decoded_as_a_stream(pulls, write_fixtures):
+    transport = LocalTransport(write_fixtures(pulls))
+    records = load_open_prs(transport.stream)
+    assert list(records) == ["101", "102", "103", "104"]
+    assert records["104"].labels == ["release", "ignore"]
+    assert transport.calls[0].startswith("gh pr list --state open --limit 5000")
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+from releaser import Release
+from utils.executor import Executor
+from utils.loader import LocalTransport
+
+LIMITED = "HTTP 403: You have exceeded a secondary rate limit."
+
+
+class Script:
+    """
+    Runner which answers every call with the next of `answers`
+    """
+
+    def __init__(self, *answers: SimpleNamespace) -> None:
+        self.answers = list(answers)
+        self.calls = list()
+
+    def __call__(self, cmd):
+        self.calls.append(cmd)
+        return self.answers.pop(0)
+
+
+def failed(what: str) -> SimpleNamespace:
+    return SimpleNamespace(fine=False, what=what)
+
+
+def executor(runner: Script, **options) -> tuple:
+    delays = list()
+    return Executor(workers=1, runner=runner, sleep=delays.append, **options), delays
+
+
+def test_retry_after_is_honoured():
+    runner = Script(failed(LIMITED + " Retry-After: 7"), SimpleNamespace(fine=True, what="{}"))
+    pool, delays = executor(runner)
+    result = pool.run(["gh", "api", "rate_limit"])
+    assert result.fine and result.retries == 1
+    assert delays == [7.0]
+
+
+def test_exponential_backoff_is_capped():
+    runner = Script(*[failed(LIMITED)] * 5, SimpleNamespace(fine=True, what=""))
+    pool, delays = executor(runner, backoff=1.0, max_backoff=5.0)
+    assert pool.run(["gh", "pr", "view", "1"]).fine
+    assert delays == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_retries_are_bounded():
+    runner = Script(*[failed(LIMITED)] * 3)
+    pool, delays = executor(runner, retries=2)
+    result = pool.run(["gh", "pr", "view", "1"])
+    assert not result.fine and result.retries == 2
+    assert len(runner.calls) == 3
+
+
+def test_other_failures_are_not_retried():
+    runner = Script(failed("no pull requests found for branch"))
+    pool, delays = executor(runner)
+    assert not pool.run(["gh", "pr", "view", "1"]).fine
+    assert delays == [] and len(runner.calls) == 1
+
+
+def test_map_keeps_the_order_of_the_commands():
+    pool = Executor(workers=4, runner=lambda cmd: SimpleNamespace(fine=True, what=cmd[-1]))
+    assert [result.what for result in pool.map([["echo", str(n)] for n in range(50)])] == [str(n) for n in range(50)]
+    pool.shutdown()
+
+
+def test_latest_tag_goes_through_the_executor(pulls, write_fixtures):
+    release = Release(workers=1)
+    release.executor.runner = LocalTransport(write_fixtures(pulls))
+    # The pre-release and drafts are skipped, the latest release is kept
+    assert release.tag == "1.0.1"
+    assert release.executor.runner.calls[0].startswith("gh release list")
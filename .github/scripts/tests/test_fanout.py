@@ -0,0 +1,82 @@
+import os
+import json
+from types import SimpleNamespace
+from fanout import fanout, read_manifest
+from utils.cache import PRCache, ScopedCache
+from utils.loader import LocalTransport
+from tests.test_cache import record
+
+HISTORY = [
+    {"oid": f"c{number}", "messageHeadline": f"Merge pull request #{number} from owner/branch", "parents": {"totalCount": 2}}
+    for number in ["104", "103", "102", "101"]
+] + [{"oid": "c0", "messageHeadline": "chore: release 1.0.1", "parents": {"totalCount": 1}}]
+
+
+class Session:
+    """
+    Stand-in for `GitHubSession` answering every repository from the same
+    fixtures, except `owner/broken` which has no release
+    """
+
+    def __init__(self, fixtures: str) -> None:
+        self.fixtures = fixtures
+        self.transports = dict()
+
+    def transport(self, repository: str) -> LocalTransport:
+        local = self.transports[repository] = LocalTransport(self.fixtures)
+
+        def answer(cmd):
+            query = " ".join(cmd)
+            if "latestRelease" in query:
+                release = None if repository == "owner/broken" else {"tagName": "1.0.1", "tagCommit": {"oid": "c0"}}
+                return SimpleNamespace(fine=True, what=json.dumps({"data": {"repository": {"latestRelease": release}}}))
+            if "defaultBranchRef" in query:
+                history = {"pageInfo": {"hasNextPage": False, "endCursor": "1"}, "nodes": HISTORY}
+                target = {"target": {"history": history}}
+                return SimpleNamespace(fine=True, what=json.dumps({"data": {"repository": {"defaultBranchRef": target}}}))
+            return local(cmd)
+        return answer
+
+
+def test_scoped_cache_keys(tmp_path):
+    shared = PRCache(str(tmp_path / "prs.jsonl"))
+    first, second = ScopedCache(shared, "owner/first"), ScopedCache(shared, "owner/second")
+    first.put(record(1))
+    assert list(shared.added) == ["owner/first#1"]
+    assert first.get("1", "2024-08-01T10:00:00Z").number == "1"
+    assert second.get("1", "2024-08-01T10:00:00Z") is None
+    # Saving is left to the owner of the shared cache
+    first.save()
+    assert not os.path.exists(tmp_path / "prs.jsonl")
+
+
+def test_fanout_shares_the_cache(repo_root, tmp_path, pulls, write_fixtures):
+    session = Session(write_fixtures(pulls))
+    out = str(tmp_path / "out")
+    repositories = ["owner/first", "owner/broken", "owner/second"]
+    cache = PRCache(str(tmp_path / "prs.jsonl"))
+    results = fanout(repositories, session, cache, out, 2, "merge")
+
+    assert [result.repository for result in results] == repositories
+    assert [result.next_tag for result in results] == ["2.0.0", "", "2.0.0"]
+    assert results[1].error == "Latest release not found"
+    with open(os.path.join(out, "owner/first/RELEASE.md")) as f:
+        release = f.read()
+    with open(os.path.join(out, "owner/second/RELEASE.md")) as f:
+        assert f.read() == release
+    assert not os.path.exists(os.path.join(out, "owner/broken"))
+
+    # The shared cache was saved once, with the entries of every repository
+    with open(tmp_path / "prs.jsonl") as f:
+        keys = sorted(json.loads(line)["number"] for line in f)
+    assert keys == sorted(f"owner/{name}#{number}" for name in ["first", "second"] for number in ["101", "102", "103", "104"])
+
+    cache = PRCache(str(tmp_path / "prs.jsonl"))
+    fanout(["owner/first"], session, cache, out, 1, "merge")
+    assert cache.hits == 4
+
+
+def test_read_manifest(tmp_path):
+    manifest = tmp_path / "releases.yaml"
+    manifest.write_text("first:\n  repo: first\n  branch: main\nsecond:\n  repo: other/second\n")
+    assert read_manifest(str(manifest), "owner") == ["owner/first", "other/second"]
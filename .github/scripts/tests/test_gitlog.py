@@ -0,0 +1,69 @@
+import os
+import subprocess
+import pytest
+from utils.gitlog import collect_prs, extract_prs
+
+COMMITS = [
+    (True, "Merge pull request #12 from owner/PLAT-12-branch"),
+    (False, "feat(PLAT-11): add the thing (#11)"),
+    (False, 'Revert "feat(PLAT-11): add the thing (#11)"'),
+    (False, "fix: cherry-pick of #10 onto main"),
+    (False, "chore: bump dependencies"),
+    (True, "Merge branch 'main' into feature"),
+]
+
+
+@pytest.mark.parametrize("convention, prs, matched", [
+    ("auto", ["12", "11", "10"], 4),
+    ("merge", ["12"], 1),
+    ("squash", ["11"], 1),
+])
+def test_collect_prs_conventions(convention, prs, matched):
+    history = collect_prs(COMMITS, convention)
+    assert history.prs == prs
+    assert history.scanned == len(COMMITS)
+    assert history.matched == matched
+
+
+def test_collect_prs_unknown_convention():
+    with pytest.raises(ValueError, match="Unknown commit convention"):
+        collect_prs(COMMITS, "rebase")
+
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo, check=True, capture_output=True
+    )
+
+
+def test_extract_prs_from_git_log(tmp_path, monkeypatch):
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "chore: release 1.0.0")
+    git(tmp_path, "tag", "1.0.0")
+    for subject in ["feat(PLAT-1): first (#1)", "fix(PLAT-2): second (#2)", 'Revert "feat(PLAT-1): first (#1)"', "chore: no pr"]:
+        git(tmp_path, "commit", "-q", "--allow-empty", "-m", subject)
+    git(tmp_path, "checkout", "-q", "-b", "PLAT-3-branch")
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "feat(PLAT-3): third")
+    git(tmp_path, "checkout", "-q", "main")
+    git(tmp_path, "merge", "-q", "--no-ff", "PLAT-3-branch", "-m", "Merge pull request #3 from owner/PLAT-3-branch")
+    monkeypatch.chdir(tmp_path)
+
+    assert extract_prs("1.0.0..HEAD").prs == ["3", "1", "2"]
+    assert extract_prs("1.0.0..HEAD", "merge").prs == ["3"]
+    assert extract_prs("1.0.0..HEAD", "squash").prs == ["2", "1"]
+    with pytest.raises(ValueError, match="Command failed"):
+        extract_prs("missing..HEAD")
+
+
+def test_extract_prs_with_a_large_stderr(tmp_path, monkeypatch):
+    # A git which fills the stderr pipe before writing stdout must not hang
+    script = tmp_path / "git"
+    script.write_text(
+        "#!/bin/sh\n"
+        "head -c 1000000 /dev/zero | tr '\\0' w >&2\n"
+        "printf 'a b\\0Merge pull request #5 from owner/branch\\n'\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+    assert extract_prs("1.0.0..HEAD").prs == ["5"]
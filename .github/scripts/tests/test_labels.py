@@ -0,0 +1,65 @@
+import pytest
+from utils.labels import LabelState, load_label_ids, sync_labels
+from utils.loader import LocalTransport
+
+# More labels than one page of `labels(first: 100)` holds
+LABELS = [f"area/{index}" for index in range(250)] + ["type/feature", "type/bugfix", 'odd "quoted" label']
+
+
+@pytest.fixture
+def transport(pulls, write_fixtures) -> LocalTransport:
+    return LocalTransport(write_fixtures(dict(pulls, labels=LABELS)))
+
+
+def test_load_label_ids_pages_by_name(transport):
+    names = [f"area/{index}" for index in range(120, 250)] + ['odd "quoted" label', "missing"]
+    label_ids = load_label_ids(names, transport)
+    assert len(label_ids) == 131
+    assert label_ids["area/249"] == "LA_area/249"
+    assert label_ids['odd "quoted" label'] == 'LA_odd "quoted" label'
+    assert "missing" not in label_ids
+    assert len(transport.calls) == 2
+
+
+def test_sync_labels_resolves_labels_past_the_first_hundred(transport):
+    changes = {
+        "101": (["area/240"], ["type/feature"]),
+        "102": (["area/240", "type/feature"], []),
+        "103": ([], []),
+    }
+    assert sync_labels(changes, transport) == 3
+    assert len(transport.calls) == 3
+
+
+def test_sync_labels_reports_missing_labels(transport):
+    with pytest.raises(ValueError, match="Labels missing of #101 do not exist"):
+        sync_labels({"101": (["missing"], [])}, transport)
+
+
+def test_label_state_fingerprint(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text("{}")
+    state = LabelState(str(tmp_path / "labels.json"), str(rules))
+    fingerprint = state.fingerprint("feat: x", "body", "PLAT-1-branch", ["type/feature", "area/a"])
+    assert state.fingerprint("feat: x", "body", "PLAT-1-branch", ["area/a", "type/feature", "area/a"]) == fingerprint
+    assert state.fingerprint("feat: y", "body", "PLAT-1-branch", ["type/feature", "area/a"]) != fingerprint
+    assert state.fingerprint("feat: x", "body", "PLAT-1-branch", ["type/feature"]) != fingerprint
+
+    # A change of the rules invalidates every fingerprint
+    rules.write_text('{"title": []}')
+    assert LabelState(str(tmp_path / "labels.json"), str(rules)).fingerprint("feat: x", "body", "PLAT-1-branch", ["type/feature", "area/a"]) != fingerprint
+
+
+def test_label_state_keeps_the_most_recent_prs(tmp_path):
+    path = str(tmp_path / "labels.json")
+    state = LabelState(path, max_entries=2)
+    for number in ["1", "2", "3"]:
+        state.put(number, f"fingerprint {number}")
+    state.put("1", "fingerprint 1 again")
+    state.save()
+
+    state = LabelState(path)
+    assert state.fingerprints == {"3": "fingerprint 3", "1": "fingerprint 1 again"}
+    assert state.unchanged("1", "fingerprint 1 again")
+    assert not state.unchanged("1", "fingerprint 1")
+    assert not state.unchanged("2", "fingerprint 2")
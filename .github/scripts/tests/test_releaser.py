@@ -0,0 +1,98 @@
+import os
+import copy
+import tracemalloc
+import pytest
+from releaser import Release
+from utils.cache import PRCache
+from utils.loader import LocalTransport
+
+
+def release_of(fixtures: str, loader: str = "gh", cache: PRCache = None, rows: dict = None) -> Release:
+    release = Release(loader=loader, workers=1, cache=cache)
+    release.executor.runner = LocalTransport(fixtures)
+    release.tag = "1.0.1"
+    release.prs = ["104", "103", "102", "101"]
+    if rows is not None:
+        release.rows = copy.deepcopy(rows)
+    return release
+
+
+@pytest.mark.parametrize("loader", ["gh", "graphql"])
+def test_notes_are_the_same_with_the_cache(repo_root, tmp_path, pulls, write_fixtures, loader):
+    fixtures = write_fixtures(pulls)
+    expected = release_of(fixtures, loader).get_release_details()
+    # The breaking change of the fixtures makes it a major release
+    assert "## 2.0.0\n" in expected["release"]
+    assert "https://github.com/chandratop/release-note-generator/pull/104" not in expected["changelog"]
+
+    cache = PRCache(str(tmp_path / "prs.jsonl"))
+    assert release_of(fixtures, loader, cache).get_release_details() == expected
+    cache.save()
+
+    # A second run is served from the cache after one `updatedAt` query
+    cache = PRCache(str(tmp_path / "prs.jsonl"))
+    release = release_of(fixtures, loader, cache)
+    assert release.get_release_details() == expected
+    assert cache.hits == 4
+    assert len(release.executor.runner.calls) == 1
+
+
+
+
+def test_draft_rows_of_edited_prs_are_rebuilt(repo_root, pulls, write_fixtures):
+    drafted = release_of(write_fixtures(pulls))
+    drafted.get_release_details()
+
+    # Retitled and labeled `ignore` after the draft was built
+    pulls["pulls"]["102"]["title"] = "fix(PLAT-102): handle a missing jira section"
+    pulls["pulls"]["102"]["updatedAt"] = "2024-08-10T10:00:00Z"
+    pulls["pulls"]["101"]["labels"]["nodes"].append({"name": "ignore"})
+    pulls["pulls"]["101"]["updatedAt"] = "2024-08-10T10:00:00Z"
+    edited = write_fixtures(pulls, "edited.json")
+
+    release = release_of(edited, rows=drafted.rows)
+    details = release.get_release_details()
+    assert details == release_of(edited).get_release_details()
+    assert "handle a missing jira section" in details["changelog"]
+    assert "pull/101" not in details["changelog"]
+    # Only the edited prs were fetched again
+    assert sorted(call.split()[3] for call in release.executor.runner.calls if call.startswith("gh pr view")) == ["101", "102"]
+
+
+def test_stream_matches_the_notes_in_memory(repo_root, tmp_path, pulls, write_fixtures):
+    fixtures = write_fixtures(pulls)
+    expected = release_of(fixtures).get_release_details()
+    cache = PRCache(str(tmp_path / "prs.jsonl"))
+    out = tmp_path / "out"
+    out.mkdir()
+    paths = release_of(fixtures, cache=cache).stream_release_details(str(out), 1 << 20)
+    for key, path in paths.items():
+        with open(path) as f:
+            assert f.read() == expected[key]
+    assert cache.added == dict()
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_stream_stays_within_the_memory_budget(repo_root, tmp_path, pulls, write_fixtures, use_cache):
+    # 600 prs with 50 KB bodies, 30 MB of text in all
+    templates = [pulls["pulls"][number] for number in ["101", "102", "103"]]
+    many = {
+        str(number): dict(templates[number % 3], body=templates[number % 3]["body"] + "x" * 50_000, url=f"https://github.com/owner/repo/pull/{number}")
+        for number in range(1, 601)
+    }
+    fixtures = write_fixtures({"pulls": many})
+    cache = PRCache(str(tmp_path / "prs.jsonl")) if use_cache else None
+    release = release_of(fixtures, cache=cache)
+    release.prs = list(many)
+    out = tmp_path / "out"
+    out.mkdir()
+
+    budget = 1 << 20
+    tracemalloc.start()
+    try:
+        release.stream_release_details(str(out), budget)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 3 * budget
+    assert not os.path.exists(tmp_path / "prs.jsonl")
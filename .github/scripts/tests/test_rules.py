@@ -0,0 +1,102 @@
+import re
+import pytest
+from pr_validator import PR
+from utils.records import PRRecord
+from utils.rules import RuleSet
+
+JIRA = "- [PLAT-1](https://example.atlassian.net/browse/PLAT-1)"
+
+
+def previous(title: str, body: str, branch: str) -> str:
+    """
+    The checks of the validator before the rules file, returning the pr
+    type or the first error message
+    """
+
+    pattern = r'^(fix|enh|feat|break)\(\w+-\d+\): [\w\d\-\. ]+$|(chore): [\w\d\-\. ]+$'
+    match = re.match(pattern, title)
+    if not match:
+        return f"Improper title: {title}\nregex: '{pattern}'"
+    pr_type = match.group(1) or match.group(2)
+
+    def section(heading: str) -> list:
+        start = body.find(f"### {heading}")
+        return body[start:body.find("-----", start)].split("\n")
+
+    if pr_type in ["fix", "enh", "feat", "break"]:
+        points = 0
+        for line in section("Related Jira Tickets"):
+            if line.startswith("-"):
+                points += 1
+                if "N/A" in line:
+                    return "Jira section cannot contain N/A"
+                if not re.match(r'^- +\[[A-Z]+-\d+\]\(https://[a-zA-Z0-9\./\-]+\)$', line.strip()):
+                    return "Jira doesn't follow the format [JIRA-ID](URL)"
+        if points == 0:
+            return "Jira section cannot be empty"
+    if pr_type == "break":
+        points = 0
+        for line in section("Breaking Changes"):
+            if line.startswith("-"):
+                points += 1
+                if "N/A" in line:
+                    return "Breaking Changes section cannot contain N/A"
+        if points == 0:
+            return "Breaking Changes section cannot be empty"
+    branch_pattern = r'.+' if pr_type == "chore" else r'[A-Z]+-\d+-[\w\d-]+'
+    if not re.match(branch_pattern, branch):
+        return f"Improper branch: {branch}"
+    return pr_type
+
+
+def current(title: str, body: str, branch: str) -> str:
+    record = PRRecord("1", title, "author", "url", body, [], branch)
+    pr = PR("1", record=record, rules=RuleSet.load())
+    try:
+        pr_type = pr.validate_title()
+        pr.validate_body(pr_type)
+        pr.validate_branch(pr_type)
+    except ValueError as e:
+        return str(e)
+    return pr_type
+
+
+def body(jiras: str = JIRA, breaking: str = "- N/A") -> str:
+    return (
+        "### Related Jira Tickets\n"
+        "<!--- MANDATORY (can't be N/A) for fix, enh, feat, break -->\n"
+        f"{jiras}\n\n-----\n\n"
+        "### What?\n- N/A\n\n-----\n\n"
+        "### Breaking Changes\n"
+        "<!--- MANDATORY (can't be N/A) for break -->\n"
+        f"{breaking}\n\n-----\n"
+    )
+
+
+@pytest.mark.parametrize("title, body, branch", [
+    ("feat(PLAT-1): add a feature", body(), "PLAT-1-feature"),
+    ("fix(PLAT-1): fix a bug", body(JIRA + "  \n" + JIRA.replace("1", "2")), "PLAT-1-fix"),
+    ("feat(PLAT-1): add a feature", body("- N/A"), "PLAT-1-feature"),
+    ("enh(PLAT-1): improve it", body("- PLAT-1"), "PLAT-1-enh"),
+    ("enh(PLAT-1): improve it", body("- [PLAT-1](http://insecure.example.com)"), "PLAT-1-enh"),
+    ("feat(PLAT-1): add a feature", body("- PLAT-1\n- N/A"), "PLAT-1-feature"),
+    ("feat(PLAT-1): add a feature", body("- N/A\n- PLAT-1"), "PLAT-1-feature"),
+    ("feat(PLAT-1): add a feature", body("no bullet points"), "PLAT-1-feature"),
+    ("feat(PLAT-1): add a feature", body(""), "PLAT-1-feature"),
+    ("break(PLAT-1): drop it", body(breaking="- N/A"), "PLAT-1-break"),
+    ("break(PLAT-1): drop it", body(breaking=""), "PLAT-1-break"),
+    ("break(PLAT-1): drop it", body(breaking="- run the migration first"), "PLAT-1-break"),
+    ("chore: bump dependencies", body("- N/A"), "bump"),
+    ("chore: bump dependencies", body("- N/A"), ""),
+    ("feat(PLAT-1): add a feature", body(), "feature-without-jira"),
+    ("feat: missing the jira", body(), "PLAT-1-feature"),
+    ("Update README.md", body(), "main"),
+])
+def test_rules_match_previous_validator(repo_root, title, body, branch):
+    assert current(title, body, branch) == previous(title, body, branch)
+
+
+def test_evaluate_reports_every_violation(repo_root):
+    result = RuleSet.load().evaluate("break(PLAT-1): drop it", body("- N/A", ""), "main")
+    assert result.type == "break"
+    assert [violation.rule for violation in result.violations] == ["jira-not-na", "breaking-required", "branch-jira"]
@@ -0,0 +1,63 @@
+import sys
+import pytest
+from utils.executor import Executor
+from utils.snapshot import snapshot
+from utils.utils import run
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / "snapshot.json.gz")
+    snapshot.record_to(path)
+    yield path
+    snapshot.mode = None
+    snapshot.commands = dict()
+    snapshot.cursors = dict()
+
+
+def counted(path, *outcomes) -> list:
+    """
+    A command whose nth run prints the nth of `outcomes`, `ok` to stdout
+    and anything else to stderr with a failure
+    """
+
+    script = (
+        "import os, sys\n"
+        f"path, outcomes = {str(path)!r}, {list(outcomes)!r}\n"
+        "count = int(open(path).read()) if os.path.exists(path) else 0\n"
+        "open(path, 'w').write(str(count + 1))\n"
+        "outcome = outcomes[min(count, len(outcomes) - 1)]\n"
+        "if outcome == 'ok':\n"
+        "    print(outcome)\n"
+        "else:\n"
+        "    sys.exit(outcome)\n"
+    )
+    return [sys.executable, "-c", script]
+
+
+def test_replay_repeats_the_recorded_results(tmp_path, recording):
+    cmd = counted(tmp_path / "count", "not found", "ok")
+    assert [run(cmd).fine for _ in range(3)] == [False, True, True]
+    snapshot.save()
+
+    snapshot.replay_from(recording)
+    # An earlier failure which is not a rate limit is kept
+    results = [run(cmd) for _ in range(4)]
+    assert [result.fine for result in results] == [False, True, True, True]
+    assert results[0].what == "not found\n"
+    assert (tmp_path / "count").read_text() == "3"
+    with pytest.raises(ValueError, match="Command not in snapshot"):
+        run(["git", "status"])
+
+
+def test_rate_limited_attempts_are_not_recorded(tmp_path, recording):
+    cmd = counted(tmp_path / "count", "API rate limit exceeded, Retry-After: 30", "ok")
+    waits = list()
+    result = Executor(workers=1, sleep=waits.append).run(cmd)
+    assert (result.fine, result.retries, waits) == (True, 1, [30.0])
+    snapshot.save()
+
+    snapshot.replay_from(recording)
+    waits = list()
+    result = Executor(workers=1, sleep=waits.append).run(cmd)
+    assert (result.fine, result.what, result.retries, waits) == (True, "ok\n", 0, [])
@@ -0,0 +1,59 @@
+import pytest
+from utils.tagfiles import find_tags, tag_pattern, update_tag_files
+
+
+@pytest.mark.parametrize("text", [
+    "release: 1.0.1",
+    "image: app:1.0.1-slim",
+    "version: 1.0.1+build.5",
+    "tag: 1.0.1-prefix",
+    "name: app-1.0.1",
+    "ref: v1.0.1",
+    "sentence ending in 1.0.1.",
+])
+def test_tag_is_bumped(text):
+    assert len(list(find_tags(text.encode(), tag_pattern("1.0.1")))) == 1
+
+
+@pytest.mark.parametrize("text", [
+    "release: 1.0.10",
+    "release: 1.0.1.2",
+    "release: 11.0.1",
+    "release: 21.0.1",
+    "release: 1.0.1-rc1",
+    "release: 1.0.1rc1",
+    "release: 1.0.1.dev0",
+    "release: 1.0.1-SNAPSHOT",
+    "release: 1.0.1-beta.2",
+])
+def test_longer_versions_are_kept(text):
+    assert list(find_tags(text.encode(), tag_pattern("1.0.1"))) == []
+
+
+def test_prerelease_ids_are_configurable():
+    assert list(find_tags(b"1.0.1-nightly", tag_pattern("1.0.1"))) != []
+    assert list(find_tags(b"1.0.1-nightly", tag_pattern("1.0.1", ["nightly"]))) == []
+    # Without identifiers only longer versions are kept
+    assert list(find_tags(b"1.0.1-rc1", tag_pattern("1.0.1", []))) != []
+
+
+def test_update_tag_files(tmp_path, monkeypatch):
+    (tmp_path / "releases.yaml").write_text("app: 1.0.1\nslim: 1.0.1-slim\nnext: 1.0.1-rc1\nother: 11.0.1\n")
+    (tmp_path / "empty.yaml").write_text("")
+    monkeypatch.chdir(tmp_path)
+
+    results = update_tag_files("1.0.1", "1.0.2", ["*.yaml"])
+    assert {result.path: result.replacements for result in results} == {"empty.yaml": 0, "releases.yaml": 2}
+    assert (tmp_path / "releases.yaml").read_text() == "app: 1.0.2\nslim: 1.0.2-slim\nnext: 1.0.1-rc1\nother: 11.0.1\n"
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_update_tag_files_in_parallel(tmp_path, monkeypatch, workers):
+    for index in range(6):
+        (tmp_path / f"service{index}.yaml").write_text(f"image: app:1.0.1\nindex: {index}\n")
+    monkeypatch.chdir(tmp_path)
+
+    results = update_tag_files("1.0.1", "1.0.2", ["*.yaml"], workers=workers)
+    assert [result.path for result in results] == sorted(f"service{index}.yaml" for index in range(6))
+    assert all(result.replacements == 1 for result in results)
+    assert (tmp_path / "service3.yaml").read_text() == "image: app:1.0.2\nindex: 3\n"
@@ -0,0 +1,61 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.trace import Tracer, command_type
+
+
+def test_command_type():
+    assert command_type("gh pr view 101 --json title") == "gh pr view"
+    assert command_type(["gh", "api", "graphql", "-f", "query=..."]) == "gh api graphql"
+    assert command_type(["git", "log", "--format=%P%x00%s", "1.0.0..HEAD"]) == "git log"
+    assert command_type([]) == ""
+
+
+def test_calls_are_attributed_to_the_innermost_phase():
+    tracer = Tracer()
+    with tracer.phase("get_release_details"):
+        tracer.record(["gh", "pr", "list"], tracer.now(), 10, True)
+        with tracer.phase("load_prs"):
+            tracer.record(["gh", "pr", "view", "101"], tracer.now(), 20, True)
+            # Pool threads without phases report the phase of the main thread
+            with ThreadPoolExecutor(2) as pool:
+                list(pool.map(lambda number: tracer.record(["gh", "pr", "view", number], tracer.now(), 5, False), ["102", "103"]))
+    tracer.record(["git", "push"], tracer.now(), 0, True)
+    tracer.retry(["gh", "pr", "view", "102"], 2)
+
+    assert [call.phase for call in tracer.calls] == ["get_release_details", "load_prs", "load_prs", "load_prs", ""]
+    summary = tracer.summary()
+    assert summary["phases"]["get_release_details"]["calls"] == {"gh pr list": 1}
+    assert summary["phases"]["load_prs"]["calls"] == {"gh pr view": 3}
+    assert summary["commands"]["gh pr view"] == {
+        "count": 3, "seconds": summary["commands"]["gh pr view"]["seconds"],
+        "stdout_bytes": 30, "failures": 2, "retries": 2
+    }
+    assert tracer.report().count("\n") == 2
+
+
+def test_chrome_trace(tmp_path):
+    tracer = Tracer()
+
+    @tracer.timed
+    def load_prs():
+        tracer.record(["gh", "pr", "view", "101"], tracer.now(), 20, True)
+
+    load_prs()
+    worker = threading.Thread(target=lambda: tracer.record(["git", "log"], tracer.now(), 0, True))
+    worker.start()
+    worker.join()
+
+    path = str(tmp_path / "trace.json")
+    tracer.write(path, chrome=True)
+    with open(path) as f:
+        trace = json.load(f)
+    events = {event["name"]: event for event in trace["traceEvents"]}
+    assert set(events) == {"test_chrome_trace.<locals>.load_prs", "gh pr view", "git log"}
+    phase, call = events["test_chrome_trace.<locals>.load_prs"], events["gh pr view"]
+    assert phase["ph"] == call["ph"] == "X"
+    assert phase["tid"] == call["tid"] == 0
+    assert events["git log"]["tid"] == 1
+    # The call lies within its phase
+    assert phase["ts"] <= call["ts"] and call["ts"] + call["dur"] <= phase["ts"] + phase["dur"]
+    assert call["args"] == {"phase": "test_chrome_trace.<locals>.load_prs", "stdout_bytes": 20, "fine": True}
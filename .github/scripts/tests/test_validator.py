@@ -0,0 +1,48 @@
+import shlex
+from pr_validator import PR, validate_batch
+from utils.executor import Executor
+from utils.labels import LabelState
+from utils.loader import LocalTransport, load_open_prs
+from utils.records import PR_FIELDS
+
+
+def test_single_pr_is_fetched_with_one_call(repo_root, pulls, write_fixtures):
+    transport = LocalTransport(write_fixtures(pulls))
+    pr = PR("101", executor=Executor(workers=1, runner=transport))
+    assert pr.validate() == "feat"
+    assert transport.calls == [f"gh pr view 101 --json {','.join(PR_FIELDS)}"]
+
+
+def test_unchanged_prs_are_not_validated_again(repo_root, tmp_path, pulls, write_fixtures):
+    transport = LocalTransport(write_fixtures(pulls))
+    executor = Executor(workers=1, runner=transport)
+    path = str(tmp_path / "labels.json")
+
+    report = validate_batch(load_open_prs(transport.stream), executor, state=LabelState(path))
+    assert report.unchanged == 0
+    passed = report.total - len(report.failures)
+
+    # Apply the label edits of the first run, which do not change the fingerprints
+    for call in transport.calls:
+        argv = shlex.split(call)
+        if argv[:3] == ["gh", "pr", "edit"]:
+            labels = pulls["pulls"][argv[3]]["labels"]["nodes"]
+            for flag, names in zip(argv[4::2], argv[5::2]):
+                for name in names.split(","):
+                    if flag == "--add-label":
+                        labels.append({"name": name})
+                    else:
+                        labels.remove({"name": name})
+    transport = LocalTransport(write_fixtures(pulls, "labeled.json"))
+    executor = Executor(workers=1, runner=transport)
+    report = validate_batch(load_open_prs(transport.stream), executor, state=LabelState(path))
+    assert report.unchanged == passed
+    assert report.labeled == 0
+    assert not any(call.startswith("gh pr edit") for call in transport.calls)
+
+    # A retitled pr is validated again
+    pulls["pulls"]["101"]["title"] = "feat(PLAT-101): a new title"
+    transport = LocalTransport(write_fixtures(pulls, "edited.json"))
+    executor = Executor(workers=1, runner=transport)
+    report = validate_batch(load_open_prs(transport.stream), executor, state=LabelState(path))
+    assert report.unchanged == passed - 1
@@ -0,0 +1,51 @@
+import subprocess
+from releaser import Release
+from utils.cache import PRCache
+from utils.watermark import Watermark
+
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo, check=True, capture_output=True
+    )
+
+
+def pr_list(tmp_path) -> list:
+    release = Release(workers=1, cache=PRCache(str(tmp_path / "prs.jsonl")))
+    release.tag = "1.0.0"
+    return release.get_pr_list()
+
+
+def test_watermark_falls_back_to_the_tag(tmp_path, monkeypatch, capsys):
+    git(tmp_path, "init", "-q", "-b", "main")
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "chore: release 1.0.0")
+    git(tmp_path, "tag", "1.0.0")
+    for subject in ["feat: first (#1)", "fix: second (#2)"]:
+        git(tmp_path, "commit", "-q", "--allow-empty", "-m", subject)
+    monkeypatch.chdir(tmp_path)
+
+    assert pr_list(tmp_path) == ["2", "1"]
+    assert "Scanned 2 commits," in capsys.readouterr().out
+
+    # Only the commits merged since the watermark are scanned
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "feat: third (#3)")
+    assert pr_list(tmp_path) == ["3", "2", "1"]
+    assert "Scanned 1 commits since" in capsys.readouterr().out
+
+    # After a force push the watermark is no longer an ancestor of main
+    git(tmp_path, "reset", "-q", "--hard", "1.0.0")
+    git(tmp_path, "commit", "-q", "--allow-empty", "-m", "feat: fourth (#4)")
+    assert pr_list(tmp_path) == ["4"]
+    assert "Scanned 1 commits," in capsys.readouterr().out
+    assert Watermark("1.0.0", "auto").prs == ["4"]
+
+
+def test_watermark_starts_over_for_another_tag(tmp_path):
+    path = str(tmp_path / "watermark.json")
+    watermark = Watermark("1.0.0", "auto", path)
+    watermark.update("abc", ["2", "1"])
+    watermark.save()
+    assert Watermark("1.0.0", "auto", path).commit == "abc"
+    assert Watermark("1.0.1", "auto", path).commit is None
+    assert Watermark("1.0.0", "merge", path).prs == []
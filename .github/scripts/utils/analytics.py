@@ -0,0 +1,161 @@
+import csv
+import io
+from array import array
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+from utils.changelog_index import parse_changelog
+
+# Types in the order of the report columns, as rendered in the changelog
+TYPES = ["feature", "enhancement", "bugfix", "breaking", "chore"]
+
+
+class ChangelogColumns:
+    """
+    Every pr row of CHANGELOG.md parsed once into columns. Releases, types
+    and authors are dictionary encoded, so a column is a compact `array`
+    of codes and the aggregates are counts over codes rather than over
+    the Markdown text.
+
+    Releases are numbered in the order of the changelog, newest first.
+    """
+
+    def __init__(self) -> None:
+        self.releases: List[str] = list()
+        self.dates = array("l")
+        self.types: List[str] = list(TYPES)
+        self.authors: List[str] = list()
+        self.release = array("l")
+        self.type = array("l")
+        self.author = array("l")
+        self.pr = array("l")
+        self.jiras = array("l")
+
+    def __len__(self) -> int:
+        return len(self.pr)
+
+    @classmethod
+    def from_changelog(cls, path: str = "CHANGELOG.md") -> "ChangelogColumns":
+        with open(path) as f:
+            return cls.from_entries(parse_changelog(f))
+
+    @classmethod
+    def from_entries(cls, entries: Iterable) -> "ChangelogColumns":
+        columns = cls()
+        type_codes = {type: code for code, type in enumerate(columns.types)}
+        author_codes: Dict[str, int] = dict()
+        release = None
+        for entry in entries:
+            if entry.release != release:
+                release = entry.release
+                columns.releases.append(release)
+                columns.dates.append(date.fromisoformat(entry.date).toordinal())
+            if entry.type not in type_codes:
+                type_codes[entry.type] = len(columns.types)
+                columns.types.append(entry.type)
+            if entry.author not in author_codes:
+                author_codes[entry.author] = len(columns.authors)
+                columns.authors.append(entry.author)
+            columns.release.append(len(columns.releases) - 1)
+            columns.type.append(type_codes[entry.type])
+            columns.author.append(author_codes[entry.author])
+            columns.pr.append(entry.pr)
+            columns.jiras.append(len(entry.jiras))
+        return columns
+
+
+def count(codes: array, size: int) -> List[int]:
+    """
+    Number of occurrences of every code below `size`
+    """
+
+    counts = Counter(codes)
+    return [counts.get(code, 0) for code in range(size)]
+
+
+def crosstab(rows: array, columns: array, shape: Tuple[int, int]) -> List[List[int]]:
+    """
+    Number of occurrences of every (row code, column code) pair
+    """
+
+    counts = Counter(zip(rows, columns))
+    return [[counts.get((row, column), 0) for column in range(shape[1])] for row in range(shape[0])]
+
+
+def report_tables(columns: ChangelogColumns) -> Dict[str, Tuple[List[str], List[list]]]:
+    """
+    The header and rows of every table of the report
+    """
+
+    releases, types, authors = len(columns.releases), len(columns.types), len(columns.authors)
+    breaking = columns.types.index("breaking")
+    by_release = crosstab(columns.release, columns.type, (releases, types))
+    without_jira = count(array("l", (release for release, jiras in zip(columns.release, columns.jiras) if jiras == 0)), releases)
+    release_rows = list()
+    for code, tag in enumerate(columns.releases):
+        # Releases are newest first, the previous one is the next code
+        interval = columns.dates[code] - columns.dates[code + 1] if code + 1 < releases else ""
+        release_rows.append(
+            [tag, date.fromordinal(columns.dates[code]).isoformat(), sum(by_release[code])]
+            + by_release[code] + [without_jira[code], interval]
+        )
+
+    total = len(columns)
+    type_rows = [
+        [type, prs, f"{prs / total * 100:.1f}%" if total else "0.0%", sum(1 for row in by_release if row[code])]
+        for code, (type, prs) in enumerate(zip(columns.types, count(columns.type, types)))
+    ]
+
+    by_author = crosstab(columns.author, columns.type, (authors, types))
+    author_releases = Counter(author for author, _ in set(zip(columns.author, columns.release)))
+    author_rows = sorted(
+        ([f"@{author}", sum(by_author[code]), author_releases[code], by_author[code][breaking]]
+         for code, author in enumerate(columns.authors)),
+        key=lambda row: (-row[1], row[0])
+    )
+
+    return {
+        "releases": (["Release", "Date", "PRs"] + columns.types + ["Without JIRA", "Days since previous"], release_rows),
+        "types": (["Type", "PRs", "Share", "Releases"], type_rows),
+        "authors": (["Author", "PRs", "Releases", "Breaking"], author_rows),
+    }
+
+
+def render_markdown(columns: ChangelogColumns) -> str:
+    """
+    Render the summary and every table of the report in Markdown
+    """
+
+    tables = report_tables(columns)
+    releases = len(columns.releases)
+    intervals = [row[-1] for row in tables["releases"][1] if row[-1] != ""]
+    breaking = [row for row in tables["types"][1] if row[0] == "breaking"][0]
+    lines = [
+        "# Release analytics\n",
+        "\n",
+        f"- Releases: {releases}" + (f" ({date.fromordinal(columns.dates[-1])} to {date.fromordinal(columns.dates[0])})" if releases else "") + "\n",
+        f"- Pull requests: {len(columns)}, {len(columns) / releases if releases else 0:.1f} per release\n",
+        f"- Days between releases: median {sorted(intervals)[len(intervals) // 2] if intervals else 0}, max {max(intervals) if intervals else 0}\n",
+        f"- Breaking changes: {breaking[1]} prs in {breaking[3]} of {releases} releases\n",
+    ]
+    titles = {"releases": "Pull requests per release", "types": "Type mix", "authors": "Authors"}
+    for name, (header, rows) in tables.items():
+        lines.append(f"\n## {titles[name]}\n")
+        lines.append("| " + " | ".join(header) + " |\n")
+        lines.append("| " + " | ".join(["--------------"] * len(header)) + " |\n")
+        for row in rows:
+            lines.append("| " + " | ".join(str(value) for value in row) + " |\n")
+    return "".join(lines)
+
+
+def render_csv(columns: ChangelogColumns, table: str) -> str:
+    """
+    Render one table of the report as CSV
+    """
+
+    header, rows = report_tables(columns)[table]
+    target = io.StringIO()
+    writer = csv.writer(target, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return target.getvalue()
@@ -0,0 +1,185 @@
+import os
+import copy
+import json
+import time
+from typing import Dict, Iterator, Optional
+from utils.records import PRRecord
+from utils.decode import loads
+
+CACHE_DIR = ".github/.cache"
+PR_CACHE_FILE = os.path.join(CACHE_DIR, "prs.jsonl")
+
+
+def ensure_cache_dir(directory: str = CACHE_DIR) -> None:
+    """
+    Create the cache directory, which ignores itself so that it never ends
+    up in the release commit (`git add .`)
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    ignore_file = os.path.join(directory, ".gitignore")
+    if not os.path.exists(ignore_file):
+        with open(ignore_file, "w") as f:
+            f.write("*\n")
+
+
+class PRCache:
+    """
+    On-disk cache of pr records stored as JSON lines.
+
+    Entries are addressed by pr number and `updatedAt`, so a record is only
+    served while the pr is unchanged on GitHub. Entries older than
+    `max_age_days` are dropped and only the `max_entries` most recently
+    cached records are kept when the file is saved.
+
+    The file is only read on the first lookup. A single pr is looked up by
+    scanning for its line without decoding the others, and new entries are
+    appended; the file is compacted whenever it was read in full.
+    """
+
+    def __init__(
+        self,
+        path: str = PR_CACHE_FILE,
+        max_entries: int = 5000,
+        max_age_days: float = 90) -> None:
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 24 * 60 * 60
+        self._entries: Optional[Dict[str, dict]] = None
+        self.added: Dict[str, dict] = dict()
+        self.scanned = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def entries(self) -> Dict[str, dict]:
+        """
+        Every entry of the file, read on first use
+        """
+
+        if self._entries is None:
+            self._entries = dict()
+            for entry in self.scan():
+                self._entries[entry["number"]] = entry
+            self._entries.update(self.added)
+        return self._entries
+
+    def scan(self, number: str = None) -> Iterator[dict]:
+        """
+        Yield the entries of the file, only the ones of `number` if given,
+        whose lines are found without decoding the other lines
+        """
+
+        if not os.path.exists(self.path):
+            return
+        prefix = None if number is None else json.dumps({"number": number})[:-1] + ","
+        with open(self.path) as f:
+            for line in f:
+                if prefix is not None and not line.startswith(prefix):
+                    continue
+                try:
+                    yield loads(line)
+                except ValueError:
+                    # A partially written line from an interrupted run
+                    continue
+
+    def lookup(self, number: str) -> Optional[dict]:
+        """
+        The entry of the pr. Only the first lookup scans the file for it,
+        any further one reads the whole file once.
+        """
+
+        if number in self.added:
+            return self.added[number]
+        if self._entries is not None or self.scanned:
+            return self.entries.get(number)
+        self.scanned = True
+        # The last line of a pr is its newest entry
+        entry = None
+        for entry in self.scan(number):
+            pass
+        return entry
+
+    def get(self, number: str, updated_at: str) -> Optional[PRRecord]:
+        """
+        Return the cached record if it is still current, otherwise None
+        """
+
+        entry = self.lookup(number)
+        if entry is None or entry["updatedAt"] != updated_at:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return PRRecord.from_json(number, entry["record"])
+
+    def put(self, record: PRRecord) -> None:
+        entry = {
+            "number": record.number,
+            "updatedAt": record.updated_at,
+            "cachedAt": time.time(),
+            "record": record.to_json()
+        }
+        self.added[record.number] = entry
+        if self._entries is not None:
+            self._entries[record.number] = entry
+
+    def evict(self) -> None:
+        """
+        Drop expired entries and keep only the newest `max_entries`
+        """
+
+        oldest = time.time() - self.max_age
+        entries = [entry for entry in self.entries.values() if entry["cachedAt"] >= oldest]
+        entries.sort(key=lambda entry: entry["cachedAt"], reverse=True)
+        self._entries = {entry["number"]: entry for entry in entries[:self.max_entries]}
+
+    def save(self) -> None:
+        """
+        Append the new entries, or evict and write the whole cache
+        atomically when it was read in full
+        """
+
+        if self._entries is None:
+            if not self.added:
+                return
+            ensure_cache_dir(os.path.dirname(self.path))
+            with open(self.path, "a") as f:
+                for entry in self.added.values():
+                    f.write(json.dumps(entry) + "\n")
+            self.added = dict()
+            return
+
+        self.evict()
+        ensure_cache_dir(os.path.dirname(self.path))
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(temp_path, self.path)
+        self.added = dict()
+
+
+class ScopedCache:
+    """
+    The entries of one repository in a `PRCache` shared by several, keyed
+    by `owner/name#number`. Saving is left to the owner of the shared cache.
+    """
+
+    def __init__(self, cache: PRCache, scope: str) -> None:
+        self.cache = cache
+        self.scope = scope
+
+    def get(self, number: str, updated_at: str) -> Optional[PRRecord]:
+        record = self.cache.get(f"{self.scope}#{number}", updated_at)
+        if record is not None:
+            record.number = number
+        return record
+
+    def put(self, record: PRRecord) -> None:
+        scoped = copy.copy(record)
+        scoped.number = f"{self.scope}#{record.number}"
+        self.cache.put(scoped)
+
+    def save(self) -> None:
+        pass
@@ -0,0 +1,116 @@
+import io
+import os
+import re
+import json
+import shutil
+import tempfile
+from typing import IO, Callable, Union
+from types import SimpleNamespace
+from utils.utils import Command, display, run
+from utils.decode import loads
+from utils.cache import CACHE_DIR, ensure_cache_dir
+from utils.loader import graphql_command
+
+CHUNK_SIZE = 1 << 20
+TAG_PATTERN = re.compile(r'^(\w*_*)(\d+\.\d+\.\d+)$')
+BOOTSTRAP_CHECKPOINT = os.path.join(CACHE_DIR, "changelog-bootstrap.json")
+RELEASES_QUERY = (
+    "query($owner: String!, $name: String!, $after: String) { repository(owner: $owner, name: $name) { "
+    "releases(first: %d, after: $after, orderBy: {field: CREATED_AT, direction: DESC}) { "
+    "pageInfo { hasNextPage endCursor } nodes { tagName publishedAt isDraft isPrerelease description } } } }"
+)
+
+
+def insert_section(path: str, heading: str, body: Union[str, IO[str]], initial: str = "") -> None:
+    """
+    Insert `body`, a string or a file, right after the `heading` line (and
+    the character which follows it) of the file at `path`, starting from
+    `initial` when the file does not exist yet.
+
+    The rest of the file is streamed in chunks through a temporary file
+    which then atomically replaces the original, so memory use does not
+    depend on the size of the file and an interrupted run leaves it intact.
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as temp:
+            if os.path.exists(path):
+                with open(path) as source:
+                    _splice(source, temp, len(heading) + 1, body)
+                shutil.copymode(path, temp_path)
+            else:
+                _splice(io.StringIO(initial), temp, len(heading) + 1, body)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _splice(source: IO[str], target: IO[str], insert_index: int, body: Union[str, IO[str]]) -> None:
+    target.write(source.read(insert_index))
+    if isinstance(body, str):
+        target.write(body)
+    else:
+        shutil.copyfileobj(body, target, CHUNK_SIZE)
+    shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+
+def render_legacy_release(node: dict) -> str:
+    """
+    Render one past release for the `Legacy Release Notes` of the changelog
+    """
+
+    return f'<details><summary>{node["tagName"]} [{node["publishedAt"][:10]}]</summary>\n\n' \
+        + (node["description"] or "") + "\n\n</details>\n\n---\n\n"
+
+
+def bootstrap_changelog(
+    transport: Callable[[Command], SimpleNamespace] = run,
+    checkpoint: str = BOOTSTRAP_CHECKPOINT,
+    page_size: int = 100) -> str:
+    """
+    Render the notes of every published release, newest first, paging
+    through all the releases with the GraphQL cursor.
+
+    The rendered notes are appended to a file next to the checkpoint after
+    every page, so an interrupted bootstrap resumes from the last page.
+    """
+
+    notes_path = os.path.splitext(checkpoint)[0] + ".md"
+    state = {"cursor": None, "length": 0, "done": False}
+    if os.path.exists(checkpoint) and os.path.exists(notes_path):
+        with open(checkpoint) as f:
+            state = json.load(f)
+    ensure_cache_dir(os.path.dirname(checkpoint))
+
+    with open(notes_path, "ab") as notes:
+        # Drop whatever was written after the last checkpoint
+        notes.truncate(state["length"])
+        notes.seek(state["length"])
+        while not state["done"]:
+            cmd = graphql_command(RELEASES_QUERY % page_size, after=state["cursor"] or "null")
+            result = transport(cmd)
+            if not result.fine:
+                raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+            releases = loads(result.what)["data"]["repository"]["releases"]
+            for node in releases["nodes"]:
+                if node["isDraft"] or node["isPrerelease"] or not TAG_PATTERN.match(node["tagName"]):
+                    continue
+                notes.write(render_legacy_release(node).encode())
+            notes.flush()
+            state = {
+                "cursor": releases["pageInfo"]["endCursor"],
+                "length": notes.tell(),
+                "done": not releases["pageInfo"]["hasNextPage"]
+            }
+            with open(f"{checkpoint}.tmp", "w") as f:
+                json.dump(state, f)
+            os.replace(f"{checkpoint}.tmp", checkpoint)
+
+    with open(notes_path, encoding="utf-8") as f:
+        changelog = f.read()
+    os.remove(notes_path)
+    os.remove(checkpoint)
+    return changelog
@@ -0,0 +1,218 @@
+import os
+import re
+import hashlib
+import sqlite3
+from types import SimpleNamespace
+from typing import IO, Iterable, Iterator, List, Optional, Union
+from utils.cache import CACHE_DIR, ensure_cache_dir
+
+CHANGELOG_INDEX = os.path.join(CACHE_DIR, "changelog.sqlite")
+# `## 1.2.0 [2024-08-12]`
+RELEASE_HEADING = re.compile(r'^## (\S+) \[(\d{4}-\d{2}-\d{2})\]\s*$')
+# The bootstrapped notes of the releases before the changelog, always last
+LEGACY_HEADING = "## Legacy Release Notes"
+PR_URL = re.compile(r'/pull/(\d+)\b')
+JIRA_ID = re.compile(r'\[([A-Z]+-\d+)\]')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    pr INTEGER NOT NULL,
+    release TEXT NOT NULL,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (pr, release)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS jiras (
+    jira TEXT NOT NULL,
+    pr INTEGER NOT NULL,
+    release TEXT NOT NULL,
+    PRIMARY KEY (jira, pr, release)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_author ON entries (author);
+CREATE INDEX IF NOT EXISTS entries_type ON entries (type);
+CREATE INDEX IF NOT EXISTS entries_release ON entries (release);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def parse_changelog(lines: Iterable[str]) -> Iterator[SimpleNamespace]:
+    """
+    Yield one entry per pr row of the `## <tag> [<date>]` tables of
+    CHANGELOG.md, reading it line by line. Rows under any other `## `
+    heading, such as the legacy release notes which hold past release
+    bodies and their tables, are skipped.
+    """
+
+    release = date = ""
+    for line in lines:
+        heading = RELEASE_HEADING.match(line)
+        if heading:
+            release, date = heading.groups()
+            continue
+        if line.startswith(LEGACY_HEADING):
+            return
+        if line.startswith("## "):
+            release = date = ""
+            continue
+        if not release or not line.startswith("| "):
+            continue
+        cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+        if len(cells) != 5:
+            continue
+        url, type, title, author, jiras = cells
+        number = PR_URL.search(url)
+        if number is None:
+            continue
+        yield SimpleNamespace(
+            pr=int(number.group(1)), release=release, date=date, type=type,
+            title=title, author=author.lstrip("@"), url=url, jiras=JIRA_ID.findall(jiras)
+        )
+    return
+
+
+class ChangelogIndex:
+    """
+    SQLite sidecar of CHANGELOG.md mapping every released pr, Jira ticket,
+    author and type to the release which shipped it. Lookups go through
+    the B-tree indexes instead of scanning the Markdown.
+
+    It lives in the cache directory rather than in the repository, along
+    with the digest of the CHANGELOG.md it was built from, and is rebuilt
+    by `open_index` whenever CHANGELOG.md no longer matches.
+    """
+
+    def __init__(self, path: str = CHANGELOG_INDEX) -> None:
+        self.path = path
+        if os.path.dirname(path):
+            ensure_cache_dir(os.path.dirname(path))
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @property
+    def digest(self) -> Optional[str]:
+        """
+        The digest of the CHANGELOG.md the index is in step with
+        """
+
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'digest'").fetchone()
+        return row[0] if row else None
+
+    def mark(self, changelog: str = "CHANGELOG.md") -> None:
+        """
+        Record that the index is in step with `changelog` as it is now
+        """
+
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('digest', ?)", (file_digest(changelog),))
+
+    def add(self, entries: Iterable[SimpleNamespace]) -> int:
+        """
+        Insert the entries, replacing the ones already indexed, in a single
+        transaction. Returns the number of entries.
+        """
+
+        count = 0
+        with self.connection:
+            for entry in entries:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry.pr, entry.release, entry.date, entry.type, entry.title, entry.author, entry.url)
+                )
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO jiras VALUES (?, ?, ?)",
+                    [(jira, entry.pr, entry.release) for jira in entry.jiras]
+                )
+                count += 1
+        return count
+
+    def add_release(self, changelog_section: Union[str, IO[str]]) -> int:
+        """
+        Index the changelog section of a new release, as rendered by
+        `get_release_details`, or the file `stream_release_details` wrote it to
+        """
+
+        if isinstance(changelog_section, str):
+            return self.add(parse_changelog(changelog_section.splitlines()))
+        changelog_section.seek(0)
+        return self.add(parse_changelog(changelog_section))
+
+    def rebuild(self, changelog: str = "CHANGELOG.md") -> int:
+        """
+        Drop everything and index the whole CHANGELOG.md again
+        """
+
+        with self.connection:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.execute("DELETE FROM jiras")
+        with open(changelog) as f:
+            count = self.add(parse_changelog(f))
+        self.mark(changelog)
+        self.connection.execute("VACUUM")
+        return count
+
+    def find(self, pr: int = None, jira: str = None, author: str = None, type: str = None, release: str = None) -> List[SimpleNamespace]:
+        """
+        Return the released entries matching all the given filters, newest
+        release first
+        """
+
+        query = "SELECT DISTINCT entries.* FROM entries"
+        conditions = list()
+        values = list()
+        if jira is not None:
+            query += " JOIN jiras ON jiras.pr = entries.pr AND jiras.release = entries.release"
+            conditions.append("jiras.jira = ?")
+            values.append(jira)
+        for column, value in [("pr", pr), ("author", author), ("type", type), ("release", release)]:
+            if value is not None:
+                conditions.append(f"entries.{column} = ?")
+                values.append(value)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY entries.date DESC, entries.release DESC, entries.pr DESC"
+        columns = ["pr", "release", "date", "type", "title", "author", "url"]
+        return [SimpleNamespace(**dict(zip(columns, row))) for row in self.connection.execute(query, values)]
+
+    def released(self, prs: Iterable[str]) -> List[str]:
+        """
+        Return the prs which already shipped in an indexed release
+        """
+
+        prs = list(prs)
+        released = set()
+        for start in range(0, len(prs), 500):
+            page = [int(pr) for pr in prs[start:start + 500]]
+            placeholders = ",".join("?" * len(page))
+            for (pr,) in self.connection.execute(f"SELECT DISTINCT pr FROM entries WHERE pr IN ({placeholders})", page):
+                released.add(str(pr))
+        return [pr for pr in prs if pr in released]
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def open_index(path: str = CHANGELOG_INDEX, changelog: str = "CHANGELOG.md") -> ChangelogIndex:
+    """
+    Open the index, building it from `changelog` the first time and
+    rebuilding it whenever `changelog` changed since, e.g. edited by hand or
+    restored from another branch
+    """
+
+    index = ChangelogIndex(path)
+    if os.path.exists(changelog) and index.digest != file_digest(changelog):
+        index.rebuild(changelog)
+    return index
@@ -0,0 +1,77 @@
+import json
+from typing import IO, Any, Iterator, Union
+
+# Below this size importing orjson costs more than it saves
+ORJSON_MIN_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_orjson = None
+
+
+def _load_orjson() -> Any:
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+            _orjson = orjson
+        except ImportError:
+            _orjson = False
+    return _orjson
+
+
+def loads(payload: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON payload exactly once, using orjson for large payloads when
+    it is installed
+    """
+
+    if len(payload) >= ORJSON_MIN_SIZE and _load_orjson():
+        return _orjson.loads(payload)
+    return json.loads(payload)
+
+
+def iter_array(stream: IO[str], chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yield the elements of a top level JSON array read from `stream` one by
+    one, so that only the element being decoded is held in memory.
+    """
+
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace and separators between elements
+        while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != "[":
+                raise ValueError(f"Expected a JSON array, found {buffer[position]!r}")
+            started = True
+            position += 1
+            continue
+        if started and position < len(buffer) and buffer[position] == "]":
+            return
+        if position < len(buffer):
+            try:
+                element, end = _decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # An element is complete once a separator follows it, a
+                # number at the end of the buffer may still be growing
+                follow = end
+                while follow < len(buffer) and buffer[follow] in _WHITESPACE:
+                    follow += 1
+                if follow < len(buffer) and buffer[follow] in ",]":
+                    yield element
+                    position = end
+                    continue
+        if eof:
+            raise ValueError("Unexpected end of JSON array")
+        chunk = stream.read(chunk_size)
+        eof = chunk == ""
+        buffer = buffer[position:] + chunk
+        position = 0
@@ -0,0 +1,60 @@
+import os
+import json
+from typing import Dict, List
+from utils.cache import CACHE_DIR, ensure_cache_dir
+
+DRAFT_FILE = os.path.join(CACHE_DIR, "draft.json")
+DRAFT_NOTES_FILE = os.path.join(CACHE_DIR, "RELEASE.draft.md")
+
+
+class Draft:
+    """
+    The release notes rows of the prs merged since `tag`, newest first,
+    persisted between runs so that every merge only builds its own rows.
+
+    A row holds the pr type, whether it is ignored, its group in the release
+    notes, its table line, its SOPs and the `updatedAt` of the pr, so that
+    the row is rebuilt once the pr is edited. The draft starts over once a
+    new release is published, i.e. when the latest tag no longer matches.
+    """
+
+    def __init__(self, tag: str, path: str = DRAFT_FILE) -> None:
+        self.path = path
+        self.tag = tag
+        self.prs: List[str] = list()
+        self.rows: Dict[str, dict] = dict()
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            try:
+                state = json.load(f)
+            except ValueError:
+                return
+        if state.get("tag") != self.tag:
+            return
+        self.prs = state["prs"]
+        self.rows = state["rows"]
+
+    def update(self, prs: List[str]) -> None:
+        """
+        Replace the prs with the ones of the release, given newest first,
+        and drop the rows of the prs which left it
+        """
+
+        self.prs = list(prs)
+        for pr in set(self.rows) - set(prs):
+            del self.rows[pr]
+
+    def save(self) -> None:
+        """
+        Write the draft atomically
+        """
+
+        ensure_cache_dir(os.path.dirname(self.path))
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"tag": self.tag, "prs": self.prs, "rows": self.rows}, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,110 @@
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, List
+from utils.utils import Command, run
+from utils.trace import tracer
+from utils.snapshot import snapshot
+
+# Messages printed by `gh` when GitHub throttles the token
+RATE_LIMIT_MARKERS = (
+    "secondary rate limit",
+    "rate limit exceeded",
+    "abuse detection",
+)
+RETRY_AFTER_PATTERN = re.compile(r'retry[- ]after\D{0,3}(\d+)', re.IGNORECASE)
+
+
+def is_rate_limited(result: SimpleNamespace) -> bool:
+    """
+    Return True if the failed command was rejected by a GitHub rate limit
+    """
+
+    if result.fine:
+        return False
+    message = result.what.lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+class Executor:
+    """
+    Runs `gh`/`git` commands on a bounded thread pool.
+
+    Commands rejected by a rate limit are retried after the `Retry-After`
+    delay when GitHub reports one, otherwise with exponential backoff.
+    Results are always returned in submission order.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        runner: Callable[[Command], SimpleNamespace] = run,
+        sleep: Callable[[float], None] = time.sleep) -> None:
+
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.runner = runner
+        self.sleep = sleep
+        self._pool = None
+
+    @property
+    def pool(self) -> Any:
+        """
+        The thread pool, started on first use
+        """
+
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def delay(self, result: SimpleNamespace, attempt: int) -> float:
+        """
+        Seconds to wait before the next attempt of a rate limited command
+        """
+
+        match = RETRY_AFTER_PATTERN.search(result.what)
+        if match:
+            return float(match.group(1))
+        return min(self.backoff * 2 ** attempt, self.max_backoff)
+
+    def run(self, cmd: Command) -> SimpleNamespace:
+        """
+        Execute the command, retrying while it is rate limited. Only the
+        final attempt is recorded in a snapshot.
+        """
+
+        attempt = 0
+        while True:
+            with snapshot.held() as recorded:
+                result = self.runner(cmd)
+            if not is_rate_limited(result) or attempt >= self.retries:
+                snapshot.keep(recorded)
+                result.retries = attempt
+                if attempt:
+                    tracer.retry(cmd, attempt)
+                return result
+            self.sleep(self.delay(result, attempt))
+            attempt += 1
+
+    def submit(self, cmd: Command) -> Any:
+        return self.pool.submit(self.run, cmd)
+
+    def map(self, cmds: List[Command]) -> List[SimpleNamespace]:
+        """
+        Execute all the commands concurrently and return their results in
+        the same order as `cmds`
+        """
+
+        if self.workers == 1:
+            return [self.run(cmd) for cmd in cmds]
+        return list(self.pool.map(self.run, cmds))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
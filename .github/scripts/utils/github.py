@@ -0,0 +1,119 @@
+import os
+import json
+import shlex
+import threading
+import http.client
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Union
+from urllib.parse import urlsplit
+from utils.trace import tracer
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+
+class GitHubSession:
+    """
+    One authenticated session to the GitHub GraphQL API shared by every
+    repository of a run.
+
+    Each worker thread keeps its own keep-alive connection, so requests
+    reuse the TLS handshake instead of paying a `gh` process and a new
+    connection per call. `GITHUB_GRAPHQL_URL` points it at another server,
+    e.g. the stub in `bench/stub_api.py`.
+    """
+
+    def __init__(self, url: str = None, token: str = None, timeout: float = 60) -> None:
+        self.url = urlsplit(url or os.environ.get("GITHUB_GRAPHQL_URL", GRAPHQL_URL))
+        token = token or os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+        self.headers = {"Content-Type": "application/json", "User-Agent": "release-note-generator"}
+        if token:
+            self.headers["Authorization"] = f"bearer {token}"
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.url.scheme == "https" else http.client.HTTPConnection
+            connection = cls(self.url.netloc, timeout=self.timeout)
+            self.local.connection = connection
+            with self.lock:
+                self.connections += 1
+        return connection
+
+    def post(self, payload: bytes) -> http.client.HTTPResponse:
+        for attempt in range(2):
+            connection = self.connection()
+            try:
+                connection.request("POST", self.url.path or "/", body=payload, headers=self.headers)
+                return connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # The server closed the idle keep-alive connection, reconnect once
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+
+    def graphql(self, query: str, variables: Dict[str, str] = None) -> SimpleNamespace:
+        """
+        Run a GraphQL query and return the boolean status and the raw
+        response, in the same shape as `run()`
+        """
+
+        start = tracer.now()
+        payload = json.dumps({"query": query, "variables": variables or dict()}).encode()
+        response = self.post(payload)
+        what = response.read().decode()
+        with self.lock:
+            self.requests += 1
+        fine = response.status == 200 and '"errors":' not in what
+        tracer.record(["POST", "graphql"], start, len(what), fine)
+        if fine:
+            return SimpleNamespace(fine=True, what=what)
+        retry_after = response.getheader("Retry-After")
+        if retry_after:
+            what += f"\nRetry-After: {retry_after}"
+        return SimpleNamespace(fine=False, what=f"HTTP {response.status}: {what}")
+
+    def transport(self, repository: str) -> Callable[[Union[str, List[str]]], SimpleNamespace]:
+        """
+        A stand-in for `run()` which answers the `gh api graphql` commands
+        of the loaders for `repository` (`owner/name`) over this session
+        """
+
+        owner, name = repository.split("/", 1)
+
+        def answer(cmd: Union[str, List[str]]) -> SimpleNamespace:
+            argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+            if argv[:3] != ["gh", "api", "graphql"]:
+                return SimpleNamespace(fine=False, what=f"unsupported command: {shlex.join(argv)}")
+            return self.graphql(*graphql_arguments(argv, owner, name))
+
+        return answer
+
+
+def graphql_arguments(argv: List[str], owner: str, name: str) -> tuple:
+    """
+    Split the `-F`/`-f` fields of a `gh api graphql` command into the query
+    and its variables, filling in the `{owner}` and `{repo}` placeholders
+    """
+
+    query = ""
+    variables = dict()
+    for index, arg in enumerate(argv):
+        if arg not in ["-F", "-f"]:
+            continue
+        key, value = argv[index + 1].split("=", 1)
+        if key == "query":
+            query = value
+            continue
+        value = value.replace("{owner}", owner).replace("{repo}", name)
+        if arg == "-F" and value == "null":
+            value = None
+        elif arg == "-F" and value.isdigit():
+            value = int(value)
+        variables[key] = value
+    return query, variables
@@ -0,0 +1,164 @@
+import re
+import subprocess
+import tempfile
+from types import SimpleNamespace
+from typing import Dict, Iterable, Iterator, List, Pattern, Tuple
+from utils.trace import tracer
+from utils.snapshot import snapshot
+from utils.utils import display, run, run_checked
+
+# `Merge pull request #123 from owner/branch`
+MERGE_PATTERN = re.compile(r'^Merge pull request #(\d+)\b')
+# `feat(PLAT-1): title (#123)`
+SQUASH_PATTERN = re.compile(r'\(#(\d+)\)\s*$')
+# Any other subject mentioning a pr, the last mention wins
+MENTION_PATTERN = re.compile(r'^.*#(\d+)\b')
+
+# Commits fetched by the first `git fetch --deepen` of a shallow clone, doubled
+# on every further fetch
+DEEPEN_START = 64
+DEEPEN_MAX = 8192
+
+CONVENTIONS: Dict[str, List[Pattern]] = {
+    "merge": [MERGE_PATTERN],
+    "squash": [SQUASH_PATTERN],
+    "auto": [MERGE_PATTERN, SQUASH_PATTERN, MENTION_PATTERN],
+}
+
+
+def match_pr(subject: str, merge: bool, convention: str = "auto") -> str:
+    """
+    Return the pr number referenced by a commit subject, or "" if the
+    commit does not follow the convention.
+    """
+
+    if convention == "merge" and not merge:
+        return ""
+    if convention == "squash" and merge:
+        return ""
+    for pattern in CONVENTIONS[convention]:
+        match = pattern.search(subject)
+        if match:
+            return match.group(1)
+    return ""
+
+
+def collect_prs(commits: Iterable[Tuple[bool, str]], convention: str = "auto") -> SimpleNamespace:
+    """
+    Collect the pr numbers referenced by `(merge, subject)` commits, newest
+    first and without duplicates (reverts, cherry-picks).
+
+    Returns the prs along with the number of commits scanned and matched.
+    """
+
+    if convention not in CONVENTIONS:
+        raise ValueError(f"Unknown commit convention: {convention}")
+    prs = dict()
+    scanned = 0
+    matched = 0
+    for merge, subject in commits:
+        scanned += 1
+        pr = match_pr(subject, merge=merge, convention=convention)
+        if pr:
+            matched += 1
+            prs.setdefault(pr, None)
+    return SimpleNamespace(prs=list(prs), scanned=scanned, matched=matched)
+
+
+def parse_log(lines: Iterable[str]) -> Iterator[Tuple[bool, str]]:
+    """
+    Yield (is merge commit, subject) for the `%P%x00%s` lines of `git log`
+    """
+
+    for line in lines:
+        parents, _, subject = line.rstrip("\n").partition("\0")
+        yield " " in parents, subject
+
+
+def extract_prs(rev_range: str, convention: str = "auto") -> SimpleNamespace:
+    """
+    Stream `git log` for the range and collect the referenced pr numbers
+    with `collect_prs`.
+    """
+
+    if convention not in CONVENTIONS:
+        raise ValueError(f"Unknown commit convention: {convention}")
+    cmd = ["git", "log", "--format=%P%x00%s", rev_range]
+    if snapshot.replaying or snapshot.recording:
+        # A snapshot holds whole outputs, the log is not streamed
+        return collect_prs(parse_log(run_checked(cmd).splitlines(keepends=True)), convention)
+    start = tracer.now()
+    size = 0
+    # stderr goes to a file, a pipe could fill up while stdout is read
+    with tempfile.TemporaryFile("w+") as errors:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors, text=True)
+
+        def lines() -> Iterable[str]:
+            nonlocal size
+            for line in process.stdout:
+                size += len(line)
+                yield line
+
+        try:
+            history = collect_prs(parse_log(lines()), convention)
+        finally:
+            process.stdout.close()
+            process.wait()
+            tracer.record(cmd, start, size, process.returncode == 0)
+        if process.returncode != 0:
+            errors.seek(0)
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {errors.read()}")
+    return history
+
+
+def is_ancestor(commit: str, branch: str = "main") -> bool:
+    """
+    Whether `commit` is in the local history of `branch`. A commit which is
+    missing or cut off by a shallow clone is not.
+    """
+
+    return run(["git", "merge-base", "--is-ancestor", commit, branch]).fine
+
+
+def is_shallow() -> bool:
+    return run_checked(["git", "rev-parse", "--is-shallow-repository"]).strip() == "true"
+
+
+def ensure_tag(tag: str) -> None:
+    """
+    Fetch the tag unless it is already there, only its commit when the
+    clone is shallow
+    """
+
+    if run(["git", "rev-parse", "--verify", "--quiet", f"refs/tags/{tag}^{{commit}}"]).fine:
+        return
+    depth = ["--depth=1"] if is_shallow() else []
+    run_checked(["git", "fetch", "--quiet", *depth, "origin", "tag", tag])
+
+
+def ensure_history(commit: str, branch: str = "main") -> bool:
+    """
+    Make the history of `branch` down to `commit` available and return
+    whether `commit` is an ancestor of `branch`.
+
+    A shallow clone is deepened from the tip of `branch`, DEEPEN_START
+    commits first and twice as many on every further fetch, so the commits
+    fetched grow with the commits since `commit`. Past DEEPEN_MAX the clone
+    is unshallowed, and a `commit` which is still not an ancestor (e.g.
+    after a force push) is reported as such.
+    """
+
+    if is_ancestor(commit, branch):
+        return True
+    if not is_shallow():
+        return False
+    depth = DEEPEN_START
+    while depth <= DEEPEN_MAX:
+        run_checked(["git", "fetch", "--quiet", f"--deepen={depth}", "origin", branch])
+        if is_ancestor(commit, branch):
+            return True
+        if not is_shallow():
+            return False
+        depth *= 2
+    run_checked(["git", "fetch", "--quiet", "--unshallow", "origin", branch])
+    return is_ancestor(commit, branch)
@@ -0,0 +1,53 @@
+from typing import Dict, List, Set
+
+# Groups of the release notes which are sorted by the rendered type
+SORTED_GROUPS = ["feat", "other"]
+
+
+class TypeIndex:
+    """
+    The prs of a release indexed once from their rows: the count of every
+    pr type, the breaking prs, the ignored prs and the prs of every release
+    notes group in the order they are rendered.
+
+    Ignored prs are not rendered, so they do not count towards the bump.
+    """
+
+    def __init__(self, prs: List[str], rows: Dict[str, dict], type_mapping: Dict[str, str]) -> None:
+        self.counts: Dict[str, int] = dict()
+        self.breaking: Set[str] = set()
+        self.ignored: Set[str] = set()
+        self.groups: Dict[str, List[str]] = {"feat": [], "break": [], "other": []}
+        for pr in prs:
+            row = rows[pr]
+            if row["ignore"]:
+                self.ignored.add(pr)
+                continue
+            self.counts[row["type"]] = self.counts.get(row["type"], 0) + 1
+            if row["type"] == "break":
+                self.breaking.add(pr)
+            self.groups[row["group"]].append(pr)
+        for group in SORTED_GROUPS:
+            self.groups[group].sort(key=lambda pr: type_mapping[rows[pr]["type"]])
+
+    def operation(self) -> int:
+        """
+        return 0 if major
+        return 1 if minor
+        return 2 if patch
+        """
+
+        return bump_operation(self.counts)
+
+
+def bump_operation(counts: Dict[str, int]) -> int:
+    """
+    The tag operation for the count of every type of the rendered prs
+    """
+
+    if counts.get("break"):
+        return 0
+    elif counts.get("feat") or counts.get("enh"):
+        return 1
+    else:
+        return 2
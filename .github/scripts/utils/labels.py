@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+from typing import Callable, Dict, List, Tuple
+from types import SimpleNamespace
+from utils.utils import Command, display, run
+from utils.decode import loads
+from utils.cache import CACHE_DIR, ensure_cache_dir
+from utils.loader import GRAPHQL_PAGE_SIZE, graphql_command, query_prs_graphql
+from utils.rules import RULES_FILE
+
+Transport = Callable[[Command], SimpleNamespace]
+
+LABEL_STATE_FILE = os.path.join(CACHE_DIR, "labels.json")
+# Number of prs relabeled by a single GraphQL mutation
+MUTATION_BATCH_SIZE = 50
+
+
+class LabelState:
+    """
+    Fingerprint of every pr which passed validation, taken with the labels
+    it was corrected to, stored in `.github/.cache/labels.json`.
+
+    The fingerprint covers the title, body, branch and labels of the pr and
+    the rules file, so an event which changes none of them (such as the
+    label edit of the validator itself) needs no new validation.
+    """
+
+    def __init__(self, path: str = LABEL_STATE_FILE, rules_path: str = RULES_FILE, max_entries: int = 5000) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.fingerprints: Dict[str, str] = dict()
+        self.rules_digest = ""
+        if os.path.exists(rules_path):
+            with open(rules_path, "rb") as f:
+                self.rules_digest = hashlib.sha256(f.read()).hexdigest()
+        if os.path.exists(path):
+            with open(path) as f:
+                try:
+                    self.fingerprints = json.load(f)
+                except ValueError:
+                    pass
+
+    def fingerprint(self, title: str, body: str, branch: str, labels: List[str]) -> str:
+        digest = hashlib.sha256()
+        for part in [self.rules_digest, title, body, branch] + sorted(set(labels)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def unchanged(self, number: str, fingerprint: str) -> bool:
+        return self.fingerprints.get(number) == fingerprint
+
+    def put(self, number: str, fingerprint: str) -> None:
+        # The most recently validated prs are kept at the end
+        self.fingerprints.pop(number, None)
+        self.fingerprints[number] = fingerprint
+
+    def save(self) -> None:
+        """
+        Keep the `max_entries` most recent fingerprints and write them
+        atomically
+        """
+
+        numbers = list(self.fingerprints)[-self.max_entries:]
+        ensure_cache_dir(os.path.dirname(self.path))
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({number: self.fingerprints[number] for number in numbers}, f)
+        os.replace(temp_path, self.path)
+
+
+def build_label_query(names: List[str]) -> str:
+    """
+    Form one GraphQL query which resolves all the given labels by name
+    using aliases
+    """
+
+    aliases = " ".join(
+        f"label{index}: label(name: {json.dumps(name)}) {{ id name }}"
+        for index, name in enumerate(names)
+    )
+    return f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {aliases} }} }}"
+
+
+def load_label_ids(names: List[str], transport: Transport = run) -> Dict[str, str]:
+    """
+    Return the node id of each of the given labels by name, in
+    ceil(N/100) `gh api graphql` calls, however many labels the repository
+    has. Labels which do not exist are left out.
+    """
+
+    label_ids = dict()
+    for start in range(0, len(names), GRAPHQL_PAGE_SIZE):
+        page = names[start:start + GRAPHQL_PAGE_SIZE]
+        cmd = graphql_command(build_label_query(page))
+        result = transport(cmd)
+        if not result.fine:
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+        repository = loads(result.what)["data"]["repository"]
+        for index in range(len(page)):
+            node = repository.get(f"label{index}")
+            if node is not None:
+                label_ids[node["name"]] = node["id"]
+    return label_ids
+
+
+def build_label_mutation(changes: Dict[str, Tuple[str, List[str], List[str]]]) -> str:
+    """
+    Form one GraphQL mutation which adds and removes the labels of all the
+    given prs, keyed by number as (pr node id, label ids to add, label ids
+    to remove), using aliases
+    """
+
+    fields = list()
+    for number, (pr_id, add_ids, remove_ids) in changes.items():
+        if add_ids:
+            fields.append(
+                f'add{number}: addLabelsToLabelable(input: {{labelableId: {json.dumps(pr_id)}, labelIds: {json.dumps(add_ids)}}}) '
+                '{ clientMutationId }'
+            )
+        if remove_ids:
+            fields.append(
+                f'remove{number}: removeLabelsFromLabelable(input: {{labelableId: {json.dumps(pr_id)}, labelIds: {json.dumps(remove_ids)}}}) '
+                '{ clientMutationId }'
+            )
+    return "mutation { " + " ".join(fields) + " }"
+
+
+def sync_labels(changes: Dict[str, Tuple[List[str], List[str]]], transport: Transport = run) -> int:
+    """
+    Apply the label changes, (labels to add, labels to remove) by pr number,
+    with ceil(L/100) queries for the ids of the L distinct labels,
+    ceil(N/100) queries for the pr ids and ceil(N/50) aliased mutations,
+    instead of one `gh pr edit` per pr.
+    Returns the number of `gh` calls made.
+    """
+
+    changes = {number: change for number, change in changes.items() if change[0] or change[1]}
+    if not changes:
+        return 0
+    names = list(dict.fromkeys(label for add_label, remove_label in changes.values() for label in add_label + remove_label))
+    label_ids = load_label_ids(names, transport)
+    for number, (add_label, remove_label) in changes.items():
+        missing = [label for label in add_label + remove_label if label not in label_ids]
+        if missing:
+            raise ValueError(f"Labels {', '.join(missing)} of #{number} do not exist in the repository")
+    numbers = list(changes)
+    pr_ids = query_prs_graphql(numbers, "id", transport)
+
+    calls = (len(names) + GRAPHQL_PAGE_SIZE - 1) // GRAPHQL_PAGE_SIZE + (len(numbers) + GRAPHQL_PAGE_SIZE - 1) // GRAPHQL_PAGE_SIZE
+    for start in range(0, len(numbers), MUTATION_BATCH_SIZE):
+        batch = {
+            number: (pr_ids[number]["id"], [label_ids[label] for label in changes[number][0]], [label_ids[label] for label in changes[number][1]])
+            for number in numbers[start:start + MUTATION_BATCH_SIZE]
+        }
+        cmd = ["gh", "api", "graphql", "-f", f"query={build_label_mutation(batch)}"]
+        result = transport(cmd)
+        if not result.fine or '"errors":' in result.what:
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+        calls += 1
+    return calls
@@ -0,0 +1,286 @@
+import io
+import re
+import json
+import shlex
+from types import SimpleNamespace
+from contextlib import contextmanager
+from typing import IO, Callable, ContextManager, Dict, Iterator, List
+from utils.utils import Command, display, run, stream
+from utils.records import PR_FIELDS, PRRecord
+from utils.decode import iter_array, loads
+from utils.executor import Executor
+from utils.gitlog import collect_prs
+
+# Number of prs resolved by a single GraphQL request
+GRAPHQL_PAGE_SIZE = 100
+PR_GRAPHQL_FIELDS = "title url body author { login } labels(first: 100) { nodes { name } } headRefName updatedAt"
+LATEST_RELEASE_QUERY = (
+    "query($owner: String!, $name: String!) { repository(owner: $owner, name: $name) { "
+    "latestRelease { tagName tagCommit { oid } } } }"
+)
+HISTORY_QUERY = (
+    "query($owner: String!, $name: String!, $after: String) { repository(owner: $owner, name: $name) { "
+    "defaultBranchRef { target { ... on Commit { history(first: %d, after: $after) { "
+    "pageInfo { hasNextPage endCursor } nodes { oid messageHeadline parents { totalCount } } } } } } } }"
+)
+
+Transport = Callable[[Command], SimpleNamespace]
+# Runs a command and yields its stdout as it is produced
+Opener = Callable[[List[str]], ContextManager[IO[str]]]
+
+
+def graphql_command(query: str, **fields: str) -> List[str]:
+    """
+    The `gh api graphql` command running `query` against the current
+    repository, with the given `-F` fields as variables
+    """
+
+    cmd = ["gh", "api", "graphql", "-F", "owner={owner}", "-F", "name={repo}"]
+    for key, value in fields.items():
+        cmd += ["-F", f"{key}={value}"]
+    return cmd + ["-f", f"query={query}"]
+
+
+def fetch_pr(number: str, runner: Transport = run) -> PRRecord:
+    """
+    Fetch the record of a single pr with one `gh pr view` call
+    """
+
+    cmd = ["gh", "pr", "view", number, "--json", ",".join(PR_FIELDS)]
+    result = runner(cmd)
+    if not result.fine:
+        raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+    return PRRecord.from_payload(number, result.what)
+
+
+def load_prs_gh(numbers: List[str], executor: Executor) -> Dict[str, PRRecord]:
+    """
+    Fetch the records of all the prs with one `gh pr view` call per pr,
+    spread over the executor's workers.
+    """
+
+    futures = [executor.pool.submit(fetch_pr, number, executor.run) for number in numbers]
+    return {number: future.result() for number, future in zip(numbers, futures)}
+
+
+def load_open_prs(opener: Opener = stream, limit: int = 5000) -> Dict[str, PRRecord]:
+    """
+    Fetch the records of all the open prs with a single `gh pr list` call,
+    which pages through the results itself. The response is decoded one pr
+    at a time as it is read, so the whole payload is never held in memory.
+    """
+
+    cmd = ["gh", "pr", "list", "--state", "open", "--limit", str(limit), "--json", ",".join(["number"] + PR_FIELDS)]
+    records = dict()
+    with opener(cmd) as response:
+        for data in iter_array(response):
+            number = str(data["number"])
+            records[number] = PRRecord.from_json(number, data)
+    return records
+
+
+def build_pr_query(numbers: List[str], fields: str = PR_GRAPHQL_FIELDS) -> str:
+    """
+    Form one GraphQL query which resolves all the given prs using aliases
+    """
+
+    aliases = " ".join(
+        f"pr{number}: pullRequest(number: {number}) {{ {fields} }}"
+        for number in numbers
+    )
+    return f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {aliases} }} }}"
+
+
+def query_prs_graphql(numbers: List[str], fields: str, transport: Transport = run) -> Dict[str, dict]:
+    """
+    Resolve the given fields of all the prs in ceil(N/100) `gh api graphql`
+    calls and return the raw `pullRequest` nodes.
+    """
+
+    nodes = dict()
+    for start in range(0, len(numbers), GRAPHQL_PAGE_SIZE):
+        page = numbers[start:start + GRAPHQL_PAGE_SIZE]
+        cmd = graphql_command(build_pr_query(page, fields))
+        result = transport(cmd)
+        if not result.fine:
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+        repository = loads(result.what)["data"]["repository"]
+        for number in page:
+            node = repository.get(f"pr{number}")
+            if node is None:
+                raise ValueError(f"Pull request #{number} not found")
+            nodes[number] = node
+    return nodes
+
+
+def load_prs_graphql(numbers: List[str], transport: Transport = run) -> Dict[str, PRRecord]:
+    """
+    Fetch the records of all the prs in ceil(N/100) `gh api graphql` calls.
+    """
+
+    nodes = query_prs_graphql(numbers, PR_GRAPHQL_FIELDS, transport)
+    return {number: PRRecord.from_graphql(number, node) for number, node in nodes.items()}
+
+
+def load_updated_at(numbers: List[str], transport: Transport = run) -> Dict[str, str]:
+    """
+    Fetch only the `updatedAt` timestamp of all the prs, used to validate
+    cached records.
+    """
+
+    nodes = query_prs_graphql(numbers, "updatedAt", transport)
+    return {number: node["updatedAt"] for number, node in nodes.items()}
+
+
+def load_latest_release(transport: Transport = run) -> SimpleNamespace:
+    """
+    Fetch the tag of the latest release and the commit it points to
+    """
+
+    cmd = graphql_command(LATEST_RELEASE_QUERY)
+    result = transport(cmd)
+    if not result.fine:
+        raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+    release = loads(result.what)["data"]["repository"]["latestRelease"]
+    if release is None:
+        raise ValueError("Latest release not found")
+    return SimpleNamespace(tag=release["tagName"], oid=release["tagCommit"]["oid"])
+
+
+def load_history_prs(stop: str, convention: str = "auto", transport: Transport = run, page_size: int = 100) -> SimpleNamespace:
+    """
+    Page through the history of the default branch, newest first, until
+    the `stop` commit and collect the referenced prs like `extract_prs`.
+    Used when there is no local clone to run `git log` in.
+    """
+
+    def commits():
+        cursor = "null"
+        while True:
+            cmd = graphql_command(HISTORY_QUERY % page_size, after=cursor)
+            result = transport(cmd)
+            if not result.fine:
+                raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+            history = loads(result.what)["data"]["repository"]["defaultBranchRef"]["target"]["history"]
+            for node in history["nodes"]:
+                if node["oid"] == stop:
+                    return
+                yield node["parents"]["totalCount"] > 1, node["messageHeadline"]
+            if not history["pageInfo"]["hasNextPage"]:
+                return
+            cursor = history["pageInfo"]["endCursor"]
+
+    return collect_prs(commits(), convention)
+
+
+class LocalTransport:
+    """
+    Stand-in for `run()` which answers `gh` commands from canned JSON
+    fixtures, so the loaders can be exercised without GitHub.
+
+    The fixture file maps pr numbers to GraphQL `pullRequest` nodes and
+    optionally lists GraphQL `Release` nodes, newest first -
+    ```
+        {"pulls": {"12": {"title": "...", "url": "...", "body": "...",
+                          "author": {"login": "..."},
+                          "labels": {"nodes": [{"name": "..."}]},
+                          "headRefName": "...", "updatedAt": "..."}},
+         "releases": [{"tagName": "...", "publishedAt": "...", "isLatest": true,
+                       "isDraft": false, "isPrerelease": false, "description": "..."}],
+         "labels": ["type/feature", "..."]}
+    ```
+
+    Pull requests get the node id `PR_<number>` and labels `LA_<name>`.
+    Label mutations always succeed.
+    """
+
+    alias_pattern = re.compile(r'pr(\d+): pullRequest\(number: \d+\)')
+    first_pattern = re.compile(r'releases\(first: (\d+)')
+    label_pattern = re.compile(r'label(\d+): label\(name: ("(?:[^"\\]|\\.)*")\)')
+
+    def __init__(self, fixture_path: str) -> None:
+        with open(fixture_path) as f:
+            fixtures = json.load(f)
+        self.pulls: dict = fixtures["pulls"]
+        self.releases: list = fixtures.get("releases", list())
+        self.labels = dict.fromkeys(fixtures.get("labels", list()))
+        for node in self.pulls.values():
+            self.labels.update(dict.fromkeys(label["name"] for label in node["labels"]["nodes"]))
+        self.calls: List[str] = list()
+
+    def __call__(self, cmd: Command) -> SimpleNamespace:
+        self.calls.append(display(cmd))
+        argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        if argv[:3] == ["gh", "api", "graphql"]:
+            return self.graphql(argv)
+        if argv[:3] == ["gh", "pr", "view"]:
+            node = self.pulls.get(argv[3])
+            if node is None:
+                return SimpleNamespace(fine=False, what=f"no pull requests found for {argv[3]}")
+            data = dict(node, labels=node["labels"]["nodes"])
+            fields = argv[argv.index("--json") + 1].split(",")
+            return SimpleNamespace(fine=True, what=json.dumps({field: data[field] for field in fields}))
+        if argv[:3] == ["gh", "pr", "list"]:
+            fields = argv[argv.index("--json") + 1].split(",")
+            response = list()
+            for number, node in self.pulls.items():
+                data = dict(node, number=int(number), labels=node["labels"]["nodes"])
+                response.append({field: data[field] for field in fields})
+            return SimpleNamespace(fine=True, what=json.dumps(response))
+        if argv[:3] == ["gh", "pr", "edit"]:
+            return SimpleNamespace(fine=True, what="")
+        if argv[:3] == ["gh", "release", "list"]:
+            releases = [
+                release for release in self.releases
+                if not (release["isDraft"] and "--exclude-drafts" in argv)
+                and not (release["isPrerelease"] and "--exclude-pre-releases" in argv)
+            ]
+            limit = int(argv[argv.index("--limit") + 1]) if "--limit" in argv else 30
+            fields = [argv[i + 1] for i, arg in enumerate(argv) if arg == "--json"]
+            response = [{field: release[field] for field in fields} for release in releases[:limit]]
+            return SimpleNamespace(fine=True, what=json.dumps(response))
+        if argv[:3] == ["gh", "release", "view"]:
+            for release in self.releases:
+                if release["tagName"] == argv[3]:
+                    return SimpleNamespace(fine=True, what=json.dumps({"body": release["description"]}))
+            return SimpleNamespace(fine=False, what="release not found")
+        return SimpleNamespace(fine=False, what=f"unsupported command: {display(cmd)}")
+
+    @contextmanager
+    def stream(self, cmd: List[str]) -> Iterator[IO[str]]:
+        """
+        Stand-in for `utils.stream()`, answering from the fixtures
+        """
+
+        result = self(cmd)
+        if not result.fine:
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+        yield io.StringIO(result.what)
+
+    def graphql(self, argv: List[str]) -> SimpleNamespace:
+        fields = dict(argv[i + 1].split("=", 1) for i, arg in enumerate(argv) if arg in ["-F", "-f"])
+        query = fields["query"]
+        if query.startswith("mutation"):
+            return SimpleNamespace(fine=True, what=json.dumps({"data": {}}))
+        labels = self.label_pattern.findall(query)
+        if labels:
+            repository = dict()
+            for index, name in labels:
+                name = json.loads(name)
+                repository[f"label{index}"] = {"id": f"LA_{name}", "name": name} if name in self.labels else None
+            return SimpleNamespace(fine=True, what=json.dumps({"data": {"repository": repository}}))
+        match = self.first_pattern.search(query)
+        if match:
+            # Cursors are plain offsets into the fixture releases
+            start = 0 if fields.get("after", "null") == "null" else int(fields["after"])
+            end = start + int(match.group(1))
+            releases = {
+                "pageInfo": {"hasNextPage": end < len(self.releases), "endCursor": str(end)},
+                "nodes": self.releases[start:end]
+            }
+            return SimpleNamespace(fine=True, what=json.dumps({"data": {"repository": {"releases": releases}}}))
+        repository = {
+            f"pr{number}": dict(self.pulls[number], id=f"PR_{number}") if number in self.pulls else None
+            for number in self.alias_pattern.findall(query)
+        }
+        return SimpleNamespace(fine=True, what=json.dumps({"data": {"repository": repository}}))
@@ -0,0 +1,104 @@
+import os
+import heapq
+import json
+import tempfile
+from typing import Iterator, List, Optional
+
+# Rough per-item overhead of a buffered key and its lines, in bytes
+ITEM_OVERHEAD = 200
+# Largest number of prs fetched and turned into rows at a time by the pipeline
+STREAM_CHUNK = 500
+# Assumed size of a pr record in memory until one is fetched, in bytes
+RECORD_ESTIMATE = 64 * 1024
+# A record in memory, with its body parsed into sections, is about this
+# many times the length of its text
+RECORD_FACTOR = 3
+
+
+def record_size(records) -> int:
+    """
+    Approximate size in memory of the largest of the records, in bytes, 0
+    when there are none
+    """
+
+    return max(
+        (RECORD_FACTOR * (len(record.body) + len(record.title)) + ITEM_OVERHEAD for record in records),
+        default=0
+    )
+
+
+def chunk_size(budget: int, item_size: int) -> int:
+    """
+    Number of records of `item_size` bytes which fit in `budget`, between 1
+    and STREAM_CHUNK
+    """
+
+    return max(1, min(STREAM_CHUNK, budget // max(item_size, 1)))
+
+
+class SortedSpill:
+    """
+    The lines of one release notes group, returned in key order.
+
+    Items are buffered in memory until their approximate size exceeds
+    `budget` bytes. The buffer is then sorted and written to a temporary
+    file as a sorted run. Iterating k-way merges the runs with the buffer,
+    reading every run line by line, so memory stays within the budget
+    however many prs the release has. It can be iterated more than once.
+    """
+
+    def __init__(self, budget: int, directory: Optional[str] = None) -> None:
+        self.budget = budget
+        self.directory = directory
+        self.buffer: List[list] = list()
+        self.size = 0
+        self.runs: List[str] = list()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, key: list, lines: List[str]) -> None:
+        """
+        Add the lines of one pr under `key`, a list of ints and strings
+        """
+
+        self.buffer.append([key, lines])
+        self.size += ITEM_OVERHEAD + sum(len(line) for line in lines)
+        self.count += 1
+        if self.size > self.budget:
+            self.spill()
+
+    def spill(self) -> None:
+        """
+        Write the buffer as a sorted run and empty it
+        """
+
+        if not self.buffer:
+            return
+        self.buffer.sort(key=lambda item: item[0])
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix="run-", suffix=".jsonl")
+        with os.fdopen(fd, "w") as f:
+            for item in self.buffer:
+                f.write(json.dumps(item) + "\n")
+        self.runs.append(path)
+        self.buffer = list()
+        self.size = 0
+
+    def __iter__(self) -> Iterator[str]:
+        self.buffer.sort(key=lambda item: item[0])
+        files = [open(path) for path in self.runs]
+        try:
+            runs = [map(json.loads, f) for f in files] + [iter(self.buffer)]
+            for _, lines in heapq.merge(*runs, key=lambda item: item[0]):
+                yield from lines
+        finally:
+            for f in files:
+                f.close()
+
+    def close(self) -> None:
+        for path in self.runs:
+            os.remove(path)
+        self.runs = list()
+        self.buffer = list()
+        self.size = 0
@@ -0,0 +1,132 @@
+from typing import Dict, List
+from utils.decode import loads
+from utils.sections import Section, parse_body
+
+# Every field the scripts need from a pull request, fetched in one call
+PR_FIELDS = ["title", "author", "url", "body", "labels", "headRefName", "updatedAt"]
+
+
+class PRRecord:
+    """
+    Metadata of a single pull request, fetched once and shared by every
+    consumer instead of one `gh pr view` per field.
+    """
+
+    def __init__(
+        self,
+        number: str,
+        title: str,
+        author: str,
+        url: str,
+        body: str,
+        labels: List[str],
+        branch: str = "",
+        updated_at: str = "") -> None:
+
+        self.number = str(number)
+        self.title = title
+        self.author = author
+        self.url = url
+        self.body = body or ""
+        self.labels = labels
+        self.branch = branch
+        self.updated_at = updated_at
+        self._sections = None
+
+    @property
+    def sections(self) -> Dict[str, Section]:
+        """
+        The sections of the body, parsed on first use
+        """
+
+        if self._sections is None:
+            self._sections = parse_body(self.body)
+        return self._sections
+
+    @classmethod
+    def from_json(cls, number: str, data: dict) -> "PRRecord":
+        """
+        Build a record from the JSON object returned by `gh pr view --json`
+        """
+
+        author = data["author"]["login"] if data["author"] else "ghost"
+        return cls(
+            number=number,
+            title=data["title"],
+            author=author,
+            url=data["url"],
+            body=data["body"],
+            labels=[label["name"] for label in data["labels"]],
+            branch=data.get("headRefName", ""),
+            updated_at=data.get("updatedAt", "")
+        )
+
+    @classmethod
+    def from_graphql(cls, number: str, node: dict) -> "PRRecord":
+        """
+        Build a record from a `pullRequest` node of the GraphQL API
+        """
+
+        return cls.from_json(number, dict(node, labels=node["labels"]["nodes"]))
+
+    @classmethod
+    def from_webhook(cls, pull_request: dict) -> "PRRecord":
+        """
+        Build a record from the `pull_request` object of a GitHub webhook
+        event, which the workflow already has, so no call is needed
+        """
+
+        return cls(
+            number=pull_request["number"],
+            title=pull_request["title"],
+            author=pull_request["user"]["login"] if pull_request.get("user") else "ghost",
+            url=pull_request["html_url"],
+            body=pull_request.get("body"),
+            labels=[label["name"] for label in pull_request.get("labels", list())],
+            branch=pull_request["head"]["ref"],
+            updated_at=pull_request.get("updated_at", "")
+        )
+
+    @classmethod
+    def from_payload(cls, number: str, payload: str) -> "PRRecord":
+        """
+        Build a record from the raw output of `gh pr view --json`
+        """
+
+        return cls.from_json(number, loads(payload))
+
+    def to_json(self) -> dict:
+        """
+        Inverse of `from_json`
+        """
+
+        return {
+            "title": self.title,
+            "author": {"login": self.author},
+            "url": self.url,
+            "body": self.body,
+            "labels": [{"name": label} for label in self.labels],
+            "headRefName": self.branch,
+            "updatedAt": self.updated_at
+        }
+
+
+class ReleaseRecord:
+    """
+    A GitHub release as returned by `gh release list/view --json`
+    """
+
+    def __init__(self, tag: str, published_at: str = "", is_latest: bool = False, body: str = "") -> None:
+        self.tag = tag
+        self.published_at = published_at
+        self.is_latest = is_latest
+        self.body = body
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ReleaseRecord":
+        return cls(
+            tag=data["tagName"],
+            published_at=data.get("publishedAt", ""),
+            is_latest=data.get("isLatest", False),
+            body=data.get("body", "")
+        )
@@ -0,0 +1,149 @@
+import re
+import json
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from utils.sections import Section, parse_body
+
+RULES_FILE = ".github/pr_rules.json"
+SECTION_TARGET = "section:"
+
+_rulesets: Dict[str, "RuleSet"] = dict()
+
+
+class Rule:
+    """
+    A single declarative check from the rules file.
+
+    Checks -
+        `match`             the title/branch must match `pattern`
+        `has_items`         the section must contain at least one bullet point
+        `no_item_contains`  no bullet point of the section may contain `text`
+        `items_match`       every bullet point of the section must match
+                            `pattern`, except the ones containing `ignore`
+        `items_are_jiras`   every bullet point of the section must be a
+                            `[JIRA-ID](URL)` link, except the ones
+                            containing `ignore`
+    """
+
+    checks = ["match", "has_items", "no_item_contains", "items_match", "items_are_jiras"]
+
+    def __init__(self, config: dict) -> None:
+        if config["check"] not in self.checks:
+            raise ValueError(f"Unknown check {config['check']} in rule {config['name']}")
+        self.name = config["name"]
+        self.target = config["target"]
+        self.check = config["check"]
+        self.types = config.get("types")
+        self.text = config.get("text", "")
+        self.ignore = config.get("ignore")
+        self.pattern = re.compile(config["pattern"]) if "pattern" in config else None
+        self.message = config["message"]
+
+    def applies(self, pr_type: str) -> bool:
+        return self.types is None or pr_type in self.types
+
+    def violation(self, value: str) -> SimpleNamespace:
+        message = self.message.format(value=value, pattern=self.pattern.pattern if self.pattern else "")
+        return SimpleNamespace(rule=self.name, message=message, value=value)
+
+    def evaluate(self, value: str, section: Optional[Section]) -> List[SimpleNamespace]:
+        if self.check == "match":
+            return [] if self.pattern.match(value) else [self.violation(value)]
+        items = section.items if section is not None else list()
+        if self.check == "has_items":
+            return [] if items else [self.violation("")]
+        if self.check == "no_item_contains":
+            return [self.violation(item) for item in items if self.text in item]
+        if self.check == "items_are_jiras":
+            jiras = section.jiras if section is not None else dict()
+            return [
+                self.violation(item) for item in items
+                if not (self.ignore and self.ignore in item) and item not in jiras
+            ]
+        return [
+            self.violation(item) for item in items
+            if not (self.ignore and self.ignore in item) and not self.pattern.match(item.strip())
+        ]
+
+
+class RuleSet:
+    """
+    All the validation rules of a pull request, compiled once per process
+    and evaluated in a single pass over the title, body and branch.
+    """
+
+    def __init__(self, config: dict) -> None:
+        self.title_pattern = re.compile(config["title"]["pattern"])
+        self.title_message = config["title"]["message"]
+        self.rules = [Rule(rule) for rule in config["rules"]]
+
+    @classmethod
+    def load(cls, path: str = RULES_FILE) -> "RuleSet":
+        if path not in _rulesets:
+            with open(path) as f:
+                _rulesets[path] = cls(json.load(f))
+        return _rulesets[path]
+
+    def classify(self, title: str) -> Optional[str]:
+        """
+        Return the pr type from the title, or None if the title is improper
+        """
+
+        match = self.title_pattern.match(title)
+        if not match:
+            return None
+        return next(group for group in match.groups() if group)
+
+    def evaluate(self, title: str, body: str, branch: str, sections: Dict[str, Section] = None) -> SimpleNamespace:
+        """
+        Return the pr type along with every violation. The rules which
+        depend on the type are skipped when the title is improper.
+        """
+
+        pr_type = self.classify(title)
+        if pr_type is None:
+            return SimpleNamespace(type=None, violations=[self.title_violation(title)])
+        if sections is None:
+            sections = parse_body(body)
+        violations = self.check(pr_type, {"title": title, "branch": branch}, sections)
+        return SimpleNamespace(type=pr_type, violations=violations)
+
+    def title_violation(self, title: str) -> SimpleNamespace:
+        message = self.title_message.format(value=title, pattern=self.title_pattern.pattern)
+        return SimpleNamespace(rule="title", message=message, value=title)
+
+    def check(
+        self,
+        pr_type: str,
+        values: Dict[str, str],
+        sections: Dict[str, Section],
+        targets: List[str] = None) -> List[SimpleNamespace]:
+        """
+        Evaluate the rules which apply to the pr type, optionally only the
+        ones for the given targets (`branch`, `section:<heading>`, ...).
+        Violations are grouped by target in the order of the rules.
+        """
+
+        violations = list()
+        for rule in self.rules:
+            if not rule.applies(pr_type):
+                continue
+            if targets is not None and not any(rule.target.startswith(target) for target in targets):
+                continue
+            if rule.target.startswith(SECTION_TARGET):
+                section = sections.get(rule.target[len(SECTION_TARGET):])
+                violations.extend((rule.target, violation) for violation in rule.evaluate("", section))
+            else:
+                violations.extend((rule.target, violation) for violation in rule.evaluate(values[rule.target], None))
+
+        # The violations of a section come in the order of its bullet points,
+        # whichever rule found them, so the first one is the first bad point
+        order = list(dict.fromkeys(target for target, _ in violations))
+
+        def position(entry: tuple) -> tuple:
+            target, violation = entry
+            section = sections.get(target[len(SECTION_TARGET):]) if target.startswith(SECTION_TARGET) else None
+            items = section.items if section is not None else list()
+            return order.index(target), items.index(violation.value) if violation.value in items else -1
+
+        return [violation for _, violation in sorted(violations, key=position)]
@@ -0,0 +1,97 @@
+import re
+from types import SimpleNamespace
+from typing import Dict, List
+
+JIRA_SECTION = "Related Jira Tickets"
+BREAKING_SECTION = "Breaking Changes"
+SEPARATOR = "-----"
+
+# `- [PLAT-1234](https://jira.example.com/browse/PLAT-1234)`
+JIRA_PATTERN = re.compile(r'^- +\[([A-Z]+-\d+)\]\((https://[a-zA-Z0-9\./\-]+)\)$')
+
+
+class Section:
+    """
+    A `### Heading` of the pull request template and the text up to the
+    next `-----` separator or heading. Lines, bullet points and Jira tickets
+    are split out on first use.
+    """
+
+    def __init__(self, heading: str, text: str = "") -> None:
+        self.heading = heading
+        self.text = text
+        self._lines = None
+        self._items = None
+        self._jiras = None
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.text.split("\n")
+        return self._lines
+
+    @property
+    def items(self) -> List[str]:
+        """
+        Lines which are bullet points
+        """
+
+        if self._items is None:
+            self._items = [line for line in self.lines if line.startswith("-")]
+        return self._items
+
+    @property
+    def jiras(self) -> Dict[str, SimpleNamespace]:
+        """
+        Bullet points which follow the `[JIRA-ID](URL)` format, mapped to
+        their Jira ID and URL
+        """
+
+        if self._jiras is None:
+            self._jiras = dict()
+            for item in self.items:
+                match = JIRA_PATTERN.match(item.strip())
+                if match:
+                    self._jiras[item] = SimpleNamespace(id=match.group(1), url=match.group(2))
+        return self._jiras
+
+
+def parse_body(body: str) -> Dict[str, Section]:
+    """
+    Scan the pull request body once and return its sections by heading.
+    When a heading repeats, the first occurrence is kept.
+    """
+
+    sections: Dict[str, Section] = dict()
+    if body.startswith("### "):
+        heading_start = 0
+    else:
+        heading_start = body.find("\n### ")
+        if heading_start == -1:
+            return sections
+        heading_start += 1
+    separator = -1
+    while True:
+        line_end = body.find("\n", heading_start)
+        if line_end == -1:
+            line_end = len(body)
+        heading = body[heading_start + 4:line_end].strip()
+        start = line_end + 1
+
+        # The section ends at the next separator or heading
+        if separator < start:
+            separator = body.find(SEPARATOR, start)
+        next_heading = body.find("\n### ", line_end)
+        if separator != -1 and (next_heading == -1 or separator <= next_heading):
+            end = separator
+        elif next_heading != -1:
+            end = next_heading + 1
+        else:
+            end = len(body)
+        if heading not in sections:
+            sections[heading] = Section(heading, body[start:end])
+
+        if next_heading == -1:
+            break
+        heading_start = next_heading + 1
+    return sections
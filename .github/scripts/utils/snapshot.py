@@ -0,0 +1,128 @@
+import os
+import gzip
+import json
+import shlex
+import tempfile
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Tuple, Union
+
+SNAPSHOT_VERSION = 1
+
+
+class Snapshot:
+    """
+    Records the result of every `gh`/`git` command run through `utils.run()`
+    into a gzipped JSON file, and replays them later without running any
+    command.
+
+    A command run several times is replayed in the recorded order, the last
+    result being repeated once they are used up. The `Executor` keeps only
+    the final attempt of a rate limited command, so a replay never waits.
+    """
+
+    def __init__(self) -> None:
+        self.mode = None
+        self.path = None
+        self.today = None
+        self.commands: Dict[str, List[dict]] = dict()
+        self.cursors: Dict[str, int] = dict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def key(cmd: Union[str, List[str]]) -> str:
+        return cmd if isinstance(cmd, str) else shlex.join(cmd)
+
+    def record_to(self, path: str) -> None:
+        """
+        Start recording, the snapshot is written to `path` by `save()`
+        """
+
+        self.mode = "record"
+        self.path = path
+        self.today = datetime.now().strftime('%Y-%m-%d')
+        self.commands = dict()
+
+    def replay_from(self, path: str) -> None:
+        """
+        Answer every command from the snapshot at `path`
+        """
+
+        with gzip.open(path, "rt") as f:
+            data = json.load(f)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {data.get('version')} in {path}")
+        self.mode = "replay"
+        self.path = path
+        self.today = data["today"]
+        self.commands = data["commands"]
+        self.cursors = dict()
+
+    @contextmanager
+    def held(self) -> Iterator[List[Tuple[Union[str, List[str]], bool, str]]]:
+        """
+        Hold back the results this thread records within the block, for the
+        caller to `keep` or drop
+        """
+
+        outer = getattr(self.local, "held", None)
+        self.local.held = held = list()
+        try:
+            yield held
+        finally:
+            self.local.held = outer
+
+    def keep(self, held: List[Tuple[Union[str, List[str]], bool, str]]) -> None:
+        for cmd, fine, what in held:
+            self.record(cmd, fine, what)
+
+    def record(self, cmd: Union[str, List[str]], fine: bool, what: str) -> None:
+        held = getattr(self.local, "held", None)
+        if held is not None:
+            held.append((cmd, fine, what))
+            return
+        key = self.key(cmd)
+        with self.lock:
+            self.commands.setdefault(key, list()).append({"fine": fine, "what": what})
+
+    def replay(self, cmd: Union[str, List[str]]) -> SimpleNamespace:
+        key = self.key(cmd)
+        with self.lock:
+            results = self.commands.get(key)
+            if not results:
+                raise ValueError(f"Command not in snapshot {self.path}: {key}")
+            cursor = self.cursors.get(key, 0)
+            self.cursors[key] = cursor + 1
+            result = results[min(cursor, len(results) - 1)]
+        return SimpleNamespace(fine=result["fine"], what=result["what"])
+
+    def save(self) -> None:
+        """
+        Write the recorded commands, replacing the snapshot atomically
+        """
+
+        if not self.recording:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt") as f:
+                json.dump({"version": SNAPSHOT_VERSION, "today": self.today, "commands": self.commands}, f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+snapshot = Snapshot()
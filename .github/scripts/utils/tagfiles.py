@@ -0,0 +1,155 @@
+import os
+import re
+import glob
+import json
+import mmap
+import shutil
+import tempfile
+from types import SimpleNamespace
+from typing import Iterator, List, Pattern
+from concurrent.futures import ThreadPoolExecutor
+
+TAG_FILES_CONFIG = ".github/release_files.json"
+DEFAULT_TAG_FILES = ["releases.yaml"]
+CHUNK_SIZE = 1 << 20
+# A version is not a whole tag when preceded by one of these bytes
+TAG_PRECEDING = frozenset(b"0123456789.")
+# Suffixes which make a version a pre-release of the tag rather than the tag
+DEFAULT_PRERELEASE_IDS = ["rc", "alpha", "beta", "pre", "preview", "dev", "snapshot"]
+
+
+def load_tag_files(path: str = TAG_FILES_CONFIG) -> List[str]:
+    """
+    Return the glob patterns of the files which carry the release tag,
+    `releases.yaml` when there is no config
+    """
+
+    if not os.path.exists(path):
+        return list(DEFAULT_TAG_FILES)
+    with open(path) as f:
+        return json.load(f)["files"]
+
+
+def load_prerelease_ids(path: str = TAG_FILES_CONFIG) -> List[str]:
+    """
+    Return the pre-release identifiers of the config, which keep a version
+    such as `1.0.1-rc1` from being replaced
+    """
+
+    if not os.path.exists(path):
+        return list(DEFAULT_PRERELEASE_IDS)
+    with open(path) as f:
+        return json.load(f).get("prerelease", DEFAULT_PRERELEASE_IDS)
+
+
+def expand(patterns: List[str]) -> List[str]:
+    """
+    Resolve the glob patterns (`**` included) to files, each listed once
+    """
+
+    files = dict()
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if os.path.isfile(path):
+                files.setdefault(os.path.normpath(path), None)
+    return list(files)
+
+
+def tag_pattern(tag: str, prerelease: List[str] = DEFAULT_PRERELEASE_IDS) -> Pattern[bytes]:
+    """
+    Match `tag` unless a longer version continues after it: `1.0.1` matches
+    in `release: 1.0.1`, `image:1.0.1-slim` and `1.0.1+build.5`, but not in
+    `1.0.10`, `1.0.1.2` or a pre-release such as `1.0.1-rc1` or `1.0.1.dev0`,
+    one of the `prerelease` identifiers (in any case) following the tag
+    after an optional `-` or `.`. Matches preceded by a version (`11.0.1`)
+    are dropped by `find_tags`.
+
+    The pattern starts with the literal tag, which lets the regex engine
+    skip ahead with a fast substring search; a leading lookbehind would
+    disable that and is about 15x slower on large files.
+    """
+
+    longer = [rb'[0-9]', rb'\.[0-9]']
+    if prerelease:
+        identifiers = b"|".join(re.escape(identifier.encode()) for identifier in prerelease)
+        longer.append(rb'[\-.]?(?i:' + identifiers + rb')(?![A-Za-z])')
+    return re.compile(re.escape(tag.encode()) + rb'(?!' + b"|".join(longer) + rb')')
+
+
+def find_tags(data: mmap.mmap, pattern: Pattern[bytes]) -> Iterator[re.Match]:
+    """
+    Yield the whole tag matches of `tag_pattern` in `data`, so `1.0.1` is
+    found in `app-1.0.1` and `v1.0.1` but not in `11.0.1`
+    """
+
+    for match in pattern.finditer(data):
+        start = match.start()
+        if start == 0 or data[start - 1] not in TAG_PRECEDING:
+            yield match
+
+
+def replace_tag(path: str, pattern: Pattern[bytes], new: bytes) -> int:
+    """
+    Replace every match of `pattern` in the file with `new` and return the
+    number of replacements.
+
+    The file is scanned through a memory map, so it is never read into
+    memory, and only rewritten (through a temporary file which atomically
+    replaces it) when the tag occurs in it.
+    """
+
+    if os.path.getsize(path) == 0:
+        return 0
+    with open(path, "rb") as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        matches = find_tags(data, pattern)
+        first = next(matches, None)
+        if first is None:
+            return 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        count = 0
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                position = 0
+                match = first
+                while match is not None:
+                    _copy(data, temp, position, match.start())
+                    temp.write(new)
+                    position = match.end()
+                    count += 1
+                    match = next(matches, None)
+                _copy(data, temp, position, len(data))
+            shutil.copymode(path, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    return count
+
+
+def _copy(data: mmap.mmap, target, start: int, end: int) -> None:
+    for offset in range(start, end, CHUNK_SIZE):
+        target.write(data[offset:min(offset + CHUNK_SIZE, end)])
+
+
+def update_tag_files(
+    tag: str,
+    next_tag: str,
+    patterns: List[str],
+    prerelease: List[str] = DEFAULT_PRERELEASE_IDS,
+    workers: int = 8) -> List[SimpleNamespace]:
+    """
+    Replace the release tag with the next one in every file matched by the
+    patterns, in parallel. Files without the tag are left untouched.
+    """
+
+    files = expand(patterns)
+    pattern = tag_pattern(tag, prerelease)
+    new = next_tag.encode()
+    if workers <= 1 or len(files) < 2:
+        counts = [replace_tag(path, pattern, new) for path in files]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(files))) as pool:
+            counts = list(pool.map(lambda path: replace_tag(path, pattern, new), files))
+    return [SimpleNamespace(path=path, replacements=count) for path, count in zip(files, counts)]
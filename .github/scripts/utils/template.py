@@ -0,0 +1,88 @@
+import io
+import os
+from typing import IO, Dict, Iterable, List, Tuple, Union
+
+RELEASE_TEMPLATE = ".github/release_template.md"
+GROUPS = ["feat", "break", "sop", "other"]
+HEADER_START = "<!--- {key} header start -->"
+BODY_END = "<!--- {key} body end -->"
+
+_plans: Dict[Tuple[str, int, int], "TemplatePlan"] = dict()
+
+
+class TemplatePlan:
+    """
+    The release template split once into static text and one removable
+    section per group -
+
+        <!--- feat header start -->   the section starts here
+        ...                          (heading, table header, ...)
+        <!--- feat body end -->      the lines of the group go right before this
+
+    A section is kept, followed by the lines of its group, only when the
+    group has lines. Rendering is a single join over the plan.
+    """
+
+    def __init__(self, template: str, groups: List[str] = GROUPS) -> None:
+        spans = list()
+        for key in groups:
+            start = template.find(HEADER_START.format(key=key))
+            end = template.find(BODY_END.format(key=key))
+            if start == -1 or end == -1 or start > end:
+                raise ValueError(f"Release template is missing the `{key}` header start or body end marker")
+            spans.append((start, end, key))
+        spans.sort()
+
+        self.pieces: List[Union[str, Tuple[str, str]]] = list()
+        position = 0
+        for start, end, key in spans:
+            if start < position:
+                raise ValueError(f"Release template section `{key}` overlaps the previous section")
+            self.pieces.append(template[position:start])
+            self.pieces.append((key, template[start:end]))
+            position = end
+        self.pieces.append(template[position:])
+
+    @classmethod
+    def load(cls, path: str = RELEASE_TEMPLATE) -> "TemplatePlan":
+        """
+        Compile the template at `path`, reusing the plan while the file is
+        unchanged
+        """
+
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if key not in _plans:
+            with open(path) as f:
+                _plans[key] = cls(f.read())
+        return _plans[key]
+
+    def render(self, replacements: Dict[str, str], groups: Dict[str, List[str]]) -> str:
+        """
+        Render the template with the `replacements` applied to its text and
+        the lines of every non-empty group inserted in its section
+        """
+
+        target = io.StringIO()
+        self.write(target, replacements, groups)
+        return target.getvalue()
+
+    def write(self, target: IO[str], replacements: Dict[str, str], groups: Dict[str, Iterable[str]]) -> None:
+        """
+        Render the template into `target`. A group may be any sized iterable
+        of lines, which is consumed as it is written.
+        """
+
+        for piece in self.pieces:
+            if isinstance(piece, str):
+                target.write(_replace(piece, replacements))
+            elif groups.get(piece[0]):
+                target.write(_replace(piece[1], replacements))
+                # The replacements apply to the template only, not to the lines
+                target.writelines(groups[piece[0]])
+
+
+def _replace(text: str, replacements: Dict[str, str]) -> str:
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+    return text
@@ -0,0 +1,182 @@
+import time
+import threading
+from types import SimpleNamespace
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Union
+
+# How many words after the program name identify a command type
+# (`gh pr view`, `gh api graphql`, `git log`, ...)
+COMMAND_DEPTH = {"gh": 2}
+
+
+def command_type(cmd: Union[str, List[str]]) -> str:
+    """
+    Reduce a command to its program and subcommands, dropping the flags and
+    arguments, so the calls of a run can be grouped
+    """
+
+    tokens = cmd.split() if isinstance(cmd, str) else cmd
+    if not tokens:
+        return ""
+    program = tokens[0]
+    depth = COMMAND_DEPTH.get(program, 1)
+    words = [token for token in tokens[1:] if not token.startswith("-") and "=" not in token and "'" not in token]
+    return " ".join([program] + words[:depth])
+
+
+class Tracer:
+    """
+    Records where a run spends its time: the phases (major `Release` and
+    `PR` methods) and every `gh`/`git` call with its wall time, stdout size,
+    failures and rate limit retries, grouped by command type.
+
+    Recording is always on and cheap; the trace is only written when asked.
+    """
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stacks: Dict[int, List[str]] = dict()
+        self.phases: List[SimpleNamespace] = list()
+        self.calls: List[SimpleNamespace] = list()
+        self.retries: Dict[str, int] = dict()
+
+    def now(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def current_phase(self) -> str:
+        """
+        The innermost open phase of this thread. Pool threads without phases
+        of their own report the innermost phase of the main thread.
+        """
+
+        stack = self.stacks.get(threading.get_ident()) or self.stacks.get(threading.main_thread().ident)
+        return stack[-1] if stack else ""
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time the enclosed block. Commands run inside it are attributed to
+        the innermost open phase, see `current_phase`.
+        """
+
+        thread = threading.get_ident()
+        start = self.now()
+        stack = self.stacks.setdefault(thread, list())
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+            phase = SimpleNamespace(name=name, start=start, seconds=self.now() - start, depth=len(stack), thread=thread)
+            with self.lock:
+                self.phases.append(phase)
+
+    def timed(self, func: Callable) -> Callable:
+        """
+        Decorator which times every call of `func` as a phase named after it
+        """
+
+        name = func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def record(self, cmd: Union[str, List[str]], start: float, stdout: int, fine: bool) -> None:
+        """
+        Record one finished command which started at `start` (`now()`) and
+        printed `stdout` characters
+        """
+
+        call = SimpleNamespace(
+            type=command_type(cmd),
+            phase=self.current_phase(),
+            start=start,
+            seconds=self.now() - start,
+            stdout=stdout,
+            fine=fine,
+            thread=threading.get_ident(),
+        )
+        with self.lock:
+            self.calls.append(call)
+
+    def retry(self, cmd: Union[str, List[str]], retries: int) -> None:
+        kind = command_type(cmd)
+        with self.lock:
+            self.retries[kind] = self.retries.get(kind, 0) + retries
+
+    def summary(self) -> dict:
+        """
+        The trace as a JSON serializable dict: totals per phase and per
+        command type, along with the calls made in every phase
+        """
+
+        phases: Dict[str, dict] = dict()
+        for phase in self.phases:
+            entry = phases.setdefault(phase.name, {"count": 0, "seconds": 0.0, "calls": dict()})
+            entry["count"] += 1
+            entry["seconds"] += phase.seconds
+
+        commands: Dict[str, dict] = dict()
+        for call in self.calls:
+            entry = commands.setdefault(call.type, {"count": 0, "seconds": 0.0, "stdout_bytes": 0, "failures": 0, "retries": 0})
+            entry["count"] += 1
+            entry["seconds"] += call.seconds
+            entry["stdout_bytes"] += call.stdout
+            entry["failures"] += not call.fine
+            if call.phase:
+                per_phase = phases[call.phase]["calls"] if call.phase in phases else dict()
+                per_phase[call.type] = per_phase.get(call.type, 0) + 1
+        for kind, retries in self.retries.items():
+            commands.setdefault(kind, {"count": 0, "seconds": 0.0, "stdout_bytes": 0, "failures": 0, "retries": 0})
+            commands[kind]["retries"] = retries
+
+        return {"seconds": self.now(), "phases": phases, "commands": commands}
+
+    def chrome(self) -> dict:
+        """
+        The trace in the Chrome trace event format, for chrome://tracing
+        or https://ui.perfetto.dev
+        """
+
+        threads: Dict[int, int] = {threading.main_thread().ident: 0}
+        events = list()
+        for phase in self.phases:
+            tid = threads.setdefault(phase.thread, len(threads))
+            events.append({
+                "name": phase.name, "cat": "phase", "ph": "X", "pid": 1, "tid": tid,
+                "ts": phase.start * 1e6, "dur": phase.seconds * 1e6
+            })
+        for call in self.calls:
+            tid = threads.setdefault(call.thread, len(threads))
+            events.append({
+                "name": call.type, "cat": "command", "ph": "X", "pid": 1, "tid": tid,
+                "ts": call.start * 1e6, "dur": call.seconds * 1e6,
+                "args": {"phase": call.phase, "stdout_bytes": call.stdout, "fine": call.fine}
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, chrome: bool = False) -> None:
+        import json
+        with open(path, "w") as f:
+            json.dump(self.chrome() if chrome else self.summary(), f, indent=None if chrome else 2)
+
+    def report(self) -> str:
+        """
+        One line per command type, slowest first
+        """
+
+        commands = self.summary()["commands"]
+        lines = [
+            f"{kind}: {entry['count']} calls, {entry['seconds'] * 1000:.1f} ms, "
+            f"{entry['stdout_bytes'] / 1024:.1f} KB, {entry['retries']} retries"
+            for kind, entry in sorted(commands.items(), key=lambda item: -item[1]["seconds"])
+        ]
+        return "\n".join(lines)
+
+
+tracer = Tracer()
@@ -1,12 +1,72 @@
+import io
+import shlex
+import tempfile
 import subprocess
-from typing import Any
+from typing import IO, Iterator, List, Union
 from types import SimpleNamespace
+from contextlib import contextmanager
+from utils.trace import tracer
+from utils.snapshot import snapshot
 
-def run(cmd: str) -> SimpleNamespace:
+Command = Union[str, List[str]]
+
+def run(cmd: Command) -> SimpleNamespace:
     """
-    Executes the command and returns boolean status and message
+    Executes the command and returns boolean status and message.
+    A command given as an argv list is executed without a shell.
+    While a snapshot is replayed, the recorded result is returned instead.
     """
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    start = tracer.now()
+    if snapshot.replaying:
+        result = snapshot.replay(cmd)
+        tracer.record(cmd, start, len(result.what) if result.fine else 0, result.fine)
+        return result
+    result = subprocess.run(cmd, shell=isinstance(cmd, str), capture_output=True, text=True)
+    tracer.record(cmd, start, len(result.stdout), result.returncode == 0)
     if result.returncode == 0:
-        return SimpleNamespace(fine=True, what=result.stdout)
-    return SimpleNamespace(fine=False, what=result.stderr)
+        result = SimpleNamespace(fine=True, what=result.stdout)
+    else:
+        result = SimpleNamespace(fine=False, what=result.stderr)
+    if snapshot.recording:
+        snapshot.record(cmd, result.fine, result.what)
+    return result
+
+def display(cmd: Command) -> str:
+    """
+    Returns the command as it would be typed in a shell
+    """
+    return cmd if isinstance(cmd, str) else shlex.join(cmd)
+
+def run_checked(cmd: Command) -> str:
+    """
+    Executes the command and returns its output, raises if it fails
+    """
+    result = run(cmd)
+    if not result.fine:
+        raise ValueError(f"Command failed: {display(cmd)}\nError: {result.what}")
+    return result.what
+
+@contextmanager
+def stream(cmd: List[str]) -> Iterator[IO[str]]:
+    """
+    Executes the command without a shell and yields its stdout as a stream,
+    so that a large output is consumed as it is produced instead of being
+    held in memory. stderr goes to a temporary file, so it cannot fill a
+    pipe while stdout is read. A snapshot holds whole outputs, so while one
+    is recorded or replayed the output is not streamed.
+    """
+    if snapshot.replaying or snapshot.recording:
+        yield io.StringIO(run_checked(cmd))
+        return
+    start = tracer.now()
+    with tempfile.TemporaryFile("w+") as errors:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors, text=True)
+        try:
+            yield process.stdout
+        finally:
+            process.stdout.close()
+            process.wait()
+            tracer.record(cmd, start, 0, process.returncode == 0)
+        if process.returncode != 0:
+            errors.seek(0)
+            raise ValueError(f"Command failed: {display(cmd)}\nError: {errors.read()}")
@@ -0,0 +1,49 @@
+import os
+import json
+from typing import List, Optional
+from utils.cache import CACHE_DIR, ensure_cache_dir
+
+WATERMARK_FILE = os.path.join(CACHE_DIR, "watermark.json")
+
+
+class Watermark:
+    """
+    The last commit of `main` whose prs were discovered for the release
+    after `tag`, along with those prs, newest first, persisted between runs
+    so that the next run only walks the commits merged since.
+
+    The watermark starts over when the latest tag or the commit convention
+    changes.
+    """
+
+    def __init__(self, tag: str, convention: str, path: str = WATERMARK_FILE) -> None:
+        self.path = path
+        self.tag = tag
+        self.convention = convention
+        self.commit: Optional[str] = None
+        self.prs: List[str] = list()
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            try:
+                state = json.load(f)
+            except ValueError:
+                return
+        if state.get("tag") != self.tag or state.get("convention") != self.convention:
+            return
+        self.commit = state["commit"]
+        self.prs = state["prs"]
+
+    def update(self, commit: str, prs: List[str]) -> None:
+        self.commit = commit
+        self.prs = list(prs)
+
+    def save(self) -> None:
+        ensure_cache_dir(os.path.dirname(self.path))
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"tag": self.tag, "convention": self.convention, "commit": self.commit, "prs": self.prs}, f)
+        os.replace(temp_path, self.path)